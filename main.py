@@ -14,6 +14,7 @@ Improvements based on expert review:
 """
 
 import rumps
+from PyObjCTools import AppHelper
 import threading
 import time
 import os
@@ -22,12 +23,20 @@ import subprocess
 import signal
 import atexit
 import logging
+import queue
 from datetime import datetime
 from pathlib import Path
+from typing import Optional
+
+try:
+    import yaml  # Imported at startup, not on the first settings toggle
+except ImportError:
+    yaml = None
 
 from recorder import (
     ScreenRecorder, AudioRecorder, BluetoothMonitor, SleepInhibitor,
-    PermissionChecker, load_config, secure_directory, secure_file, play_sound
+    PermissionChecker, load_config, secure_directory, play_sound,
+    atomic_write, dump_json, load_json, fsync_directory, make_session_dir, write_new_file
 )
 from version import __version__
 
@@ -41,6 +50,27 @@ STATE_FILE = Path.home() / ".macos-recorder" / "state.json"
 # P1 fix (Memory): Event buffer limits
 MAX_EVENT_BUFFER = 10000
 
+# Pre-formatted two-digit strings for minutes/seconds in the duration display
+_SS = [f"{i:02d}" for i in range(60)]
+
+# Trailing delay before toggled settings are written to config.yaml
+PERSIST_DELAY = 2.0
+
+# Signals that trigger a graceful shutdown (delivered via a wakeup fd)
+SHUTDOWN_SIGNALS = {signal.SIGINT, signal.SIGTERM}
+
+# Userspace buffer for events.jsonl; the writer thread flushes per batch
+EVENT_FILE_BUFFER = 1 << 20
+
+# Sentinel that tells the event writer thread to exit
+_WRITER_STOP = object()
+
+
+def _scan_files(directory: Path) -> list:
+    """List regular files in directory as os.DirEntry objects."""
+    with os.scandir(directory) as it:
+        return [e for e in it if e.is_file()]
+
 
 class ConsentManager:
     """Manages user consent for data collection (GDPR compliance)."""
@@ -50,13 +80,19 @@ class ConsentManager:
     
     def __init__(self):
         self.CONSENT_FILE.parent.mkdir(exist_ok=True)
+        self._consent_cache: Optional[bool] = None
     
     def has_consent(self) -> bool:
-        """Check if user has given consent."""
+        """Check if user has given consent (file is read once per process)."""
+        if self._consent_cache is None:
+            self._consent_cache = self._read_consent()
+        return self._consent_cache
+    
+    def _read_consent(self) -> bool:
         if not self.CONSENT_FILE.exists():
             return False
         try:
-            data = json.loads(self.CONSENT_FILE.read_text())
+            data = load_json(self.CONSENT_FILE.read_bytes())
             return data.get("granted", False) and data.get("version") == self.CONSENT_VERSION
         except (json.JSONDecodeError, KeyError, IOError) as e:
             logger.warning(f"Consent file error: {e}")
@@ -85,7 +121,8 @@ class ConsentManager:
             "timestamp": datetime.now().isoformat()
         }
         
-        self.CONSENT_FILE.write_text(json.dumps(consent_data, indent=2))
+        self.CONSENT_FILE.write_bytes(dump_json(consent_data, indent=True))
+        self._consent_cache = response == 1
         return response == 1
 
 
@@ -105,11 +142,13 @@ class RecorderApp(rumps.App):
         self._recording_lock = threading.Lock()
         self.start_time = None
         
-        # P0 fix: event buffering
-        self._event_buffer = []
-        self._event_buffer_lock = threading.Lock()
+        # P0 fix: event buffering (written by a dedicated thread)
+        self._event_queue = queue.Queue(maxsize=MAX_EVENT_BUFFER)
+        self._writer_thread = None
         self._last_size_update = 0  # P0 fix: throttle size updates
         self._cached_size = 0
+        self._start_monotonic = 0.0
+        self._last_shown = (-1, -1, -1)  # last (h, m, s) shown in the menu bar
         
         # Load config
         self.config = load_config()
@@ -118,12 +157,12 @@ class RecorderApp(rumps.App):
         secure_directory(self.output_dir)
         
         # P0 fix: recover from previous crash
+        STATE_FILE.parent.mkdir(exist_ok=True)  # once, not on every save
         self._recover_from_crash()
         
-        # P0 fix: register cleanup handlers
-        atexit.register(self._cleanup_on_exit)
-        signal.signal(signal.SIGTERM, self._handle_signal)
-        signal.signal(signal.SIGINT, self._handle_signal)
+        # P0 fix: register cleanup handlers (atexit only while recording)
+        self._shutdown_in_progress = False
+        self._install_signal_thread()
         
         # Recording settings (toggleable)
         self.settings = {
@@ -135,6 +174,9 @@ class RecorderApp(rumps.App):
             "anonymize_bluetooth": self.config["bluetooth"].get("anonymize", True),
         }
         
+        # Pending debounced config write
+        self._persist_timer = None
+        
         # Recording components
         self.screen_recorder = None
         self.audio_recorder = None
@@ -144,6 +186,7 @@ class RecorderApp(rumps.App):
         
         # Event log
         self.event_file = None
+        self._events_path = None
         self.session_dir = None
         
         # Consent manager
@@ -172,7 +215,7 @@ class RecorderApp(rumps.App):
         """Check for incomplete recording from previous crash."""
         if STATE_FILE.exists():
             try:
-                state = json.loads(STATE_FILE.read_text())
+                state = load_json(STATE_FILE.read_bytes())
                 if state.get("recording") and state.get("session_dir"):
                     session_dir = Path(state["session_dir"])
                     if session_dir.exists():
@@ -191,26 +234,51 @@ class RecorderApp(rumps.App):
     
     def _save_state(self):
         """Save current recording state for crash recovery."""
-        STATE_FILE.parent.mkdir(exist_ok=True)
         state = {
             "recording": self.recording,
             "session_dir": str(self.session_dir) if self.session_dir else None,
             "start_time": self.start_time,
             "pid": os.getpid()
         }
-        # P0 fix (Data Integrity): atomic write via temp file + rename
-        temp_file = STATE_FILE.with_suffix('.tmp')
-        temp_file.write_text(json.dumps(state))
-        temp_file.replace(STATE_FILE)  # Atomic on POSIX
+        # P0 fix (Data Integrity): durable atomic write via temp file + rename
+        atomic_write(STATE_FILE, dump_json(state), mode=0o600)
     
     def _clear_state(self):
         """Clear state file after normal stop."""
         STATE_FILE.unlink(missing_ok=True)
     
-    def _handle_signal(self, signum, frame):
-        """Handle shutdown signals gracefully."""
+    def _install_signal_thread(self):
+        """Route shutdown signals through a wakeup fd to a watcher thread.
+        
+        Handlers instead of a blocked mask: a blocked mask would be inherited by
+        ffmpeg/caffeinate/afplay, which then ignore SIGINT/SIGTERM. The C-level
+        handler writes the signal number to the fd even while AppKit's run loop
+        keeps Python off the main thread. Must run on the main thread.
+        """
+        wake_r, wake_w = os.pipe()
+        os.set_blocking(wake_w, False)
+        signal.set_wakeup_fd(wake_w)
+        for sig in SHUTDOWN_SIGNALS:
+            signal.signal(sig, lambda *_: None)  # real work happens in _signal_wait_loop
+        threading.Thread(target=self._signal_wait_loop, args=(wake_r,), daemon=True).start()
+    
+    def _signal_wait_loop(self, wake_r: int):
+        """Wait for shutdown signals and hand them to the main thread."""
+        while True:
+            for signum in os.read(wake_r, 64):
+                if signum not in SHUTDOWN_SIGNALS:
+                    continue
+                # A second signal during shutdown must not re-enter stop_recording
+                if self._shutdown_in_progress:
+                    os._exit(128 + signum)
+                self._shutdown_in_progress = True
+                AppHelper.callAfter(self._handle_signal, signum)
+    
+    def _handle_signal(self, signum):
+        """Handle shutdown signals gracefully (runs on the main thread)."""
         if self.recording:
             self.stop_recording()
+        self._flush_persist()
         rumps.quit_application()
     
     def _cleanup_on_exit(self):
@@ -286,9 +354,27 @@ class RecorderApp(rumps.App):
             self._persist_settings()
     
     def _persist_settings(self):
-        """P0 fix (Config): Save UI settings to config file."""
+        """P0 fix (Config): Save UI settings to config file (debounced)."""
+        # Restart the trailing timer so a burst of toggles writes once
+        if self._persist_timer:
+            self._persist_timer.cancel()
+        self._persist_timer = threading.Timer(PERSIST_DELAY, self._do_persist)
+        self._persist_timer.daemon = True
+        self._persist_timer.start()
+    
+    def _flush_persist(self):
+        """Write any pending settings change immediately."""
+        timer, self._persist_timer = self._persist_timer, None
+        if timer and timer.is_alive():
+            timer.cancel()
+            self._do_persist()
+    
+    def _do_persist(self):
+        """Write current settings to config.yaml atomically."""
+        if yaml is None:
+            logger.warning("PyYAML not installed; settings not persisted")
+            return
         try:
-            import yaml
             config_path = Path(__file__).parent / "config.yaml"
             
             # Update config with current settings
@@ -296,8 +382,11 @@ class RecorderApp(rumps.App):
             self.config["audio"]["microphone"] = self.settings["record_mic"]
             self.config["bluetooth"]["enabled"] = self.settings["record_bluetooth"]
             
-            with open(config_path, 'w') as f:
-                yaml.dump(self.config, f, default_flow_style=False, allow_unicode=True)
+            # LibYAML-backed dumper when available
+            dumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+            payload = yaml.dump(self.config, Dumper=dumper,
+                                default_flow_style=False, allow_unicode=True)
+            atomic_write(config_path, payload.encode())
             
             logger.info("Settings persisted to config.yaml")
         except Exception as e:
@@ -363,6 +452,9 @@ class RecorderApp(rumps.App):
         
         self.recording = True
         self.start_time = time.time()
+        self._start_monotonic = time.monotonic()
+        self._last_shown = (-1, -1, -1)
+        self._last_size_update = 0
         
         # P0 fix (Real-time): Create reference timestamp for A/V sync
         self._reference_time = {
@@ -373,17 +465,17 @@ class RecorderApp(rumps.App):
         
         # Create session directory
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        self.session_dir = self.output_dir / f"recording_{timestamp}"
-        self.session_dir.mkdir(exist_ok=True)
-        secure_directory(self.session_dir)
+        self.session_dir = make_session_dir(self.output_dir, f"recording_{timestamp}")
         
         # Write reference timestamp to session (for post-processing sync)
         ref_file = self.session_dir / "reference_time.json"
-        ref_file.write_text(json.dumps(self._reference_time, indent=2))
-        secure_file(ref_file)
+        write_new_file(ref_file, dump_json(self._reference_time, indent=True))  # synced with the dir below
         
-        # Open event log
-        self.event_file = open(self.session_dir / "events.jsonl", "w")
+        # Open event log, created 0600 in the same syscall
+        self._events_path = self.session_dir / "events.jsonl"
+        fd = os.open(self._events_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        self.event_file = os.fdopen(fd, "wb", buffering=EVENT_FILE_BUFFER)
+        self._start_writer()
         
         # Prevent sleep
         self.sleep_inhibitor = SleepInhibitor()
@@ -394,17 +486,32 @@ class RecorderApp(rumps.App):
         
         errors = []
         
-        # Start screen recording
+        # Start screen recording; mic and system audio ride in the same ffmpeg
+        # (one process, one clock, AAC) and only fall back to sounddevice without it
+        audio_outputs = []
         if self.settings["record_screen"]:
+            if self.settings["record_mic"]:
+                audio_outputs.append(("default", self.session_dir / "mic.m4a"))
+            if self.settings["record_audio"]:
+                blackhole = next((d for d in ScreenRecorder.list_audio_devices() if "BlackHole" in d), None)
+                if blackhole:  # otherwise AudioRecorder below reports the missing device
+                    audio_outputs.append((blackhole, self.session_dir / "audio.m4a"))
             self.screen_recorder = ScreenRecorder(
                 output_path=self.session_dir / "screen.mp4",
-                fps=self.settings["fps"]
+                fps=self.settings["fps"],
+                codec=self.config["recording"].get("codec", "auto"),
+                bitrate=self.config["recording"].get("bitrate"),
+                audio_outputs=audio_outputs
             )
-            if not self.screen_recorder.start():
+            if self.screen_recorder.start():
+                audio_outputs = self.screen_recorder.audio_outputs  # less any that failed to open
+            else:
                 errors.append(f"Screen: {self.screen_recorder.get_error()}")
+                audio_outputs = []
+        in_screen = {path.name for _, path in audio_outputs}
         
         # Start audio recording (system audio)
-        if self.settings["record_audio"]:
+        if self.settings["record_audio"] and "audio.m4a" not in in_screen:
             self.audio_recorder = AudioRecorder(
                 output_path=self.session_dir / "audio.wav",
                 source="system"
@@ -412,7 +519,7 @@ class RecorderApp(rumps.App):
             self.audio_recorder.start()
         
         # Start microphone recording
-        if self.settings["record_mic"]:
+        if self.settings["record_mic"] and "mic.m4a" not in in_screen:
             self.mic_recorder = AudioRecorder(
                 output_path=self.session_dir / "mic.wav",
                 source="microphone"
@@ -427,14 +534,21 @@ class RecorderApp(rumps.App):
             )
             self.bluetooth_monitor.start()
         
+        # One directory fsync makes all session file entries durable together
+        try:
+            fsync_directory(self.session_dir)
+        except OSError as e:
+            logger.warning(f"Failed to sync session directory: {e}")
+        
         # Log recording start
         self._log_event("recording", {
             "action": "start",
-            "options": {k: v for k, v in self.settings.items()}
+            "options": self.settings.copy()
         })
         
         # P0 fix: Save state for crash recovery
         self._save_state()
+        atexit.register(self._cleanup_on_exit)
         
         # Update UI
         self.start_item.title = "⏹️ Stop Recording"
@@ -488,24 +602,22 @@ class RecorderApp(rumps.App):
             self.sleep_inhibitor = None
         
         # P0 fix: Flush remaining events before closing
-        self._flush_events()
+        writer_finished = self._stop_writer()
         
-        # Close event log
-        if self.event_file:
-            self.event_file.close()
-            secure_file(self.session_dir / "events.jsonl")
-            self.event_file = None
+        # The writer closes the event log; a lagging one keeps it until done
+        self.event_file = None
         
         # P1 fix (Data Integrity): Create completion marker
-        if self.session_dir:
+        if not writer_finished:
+            logger.warning("Events still being written, not marking session complete")
+        elif self.session_dir:
             completion_marker = self.session_dir / "COMPLETE"
             completion_data = {
                 "completed_at": datetime.now().isoformat(),
                 "duration_seconds": int(time.time() - self.start_time) if self.start_time else 0,
-                "files": [f.name for f in self.session_dir.iterdir() if f.is_file()]
+                "files": [e.name for e in _scan_files(self.session_dir)]
             }
-            completion_marker.write_text(json.dumps(completion_data, indent=2))
-            secure_file(completion_marker)
+            write_new_file(completion_marker, dump_json(completion_data, indent=True))
         
         # P0 fix: Clear state file after normal stop
         self._clear_state()
@@ -513,10 +625,13 @@ class RecorderApp(rumps.App):
         # Play stop sound
         play_sound("Glass")
         
-        # Calculate total size
-        total_size = sum(
-            f.stat().st_size for f in self.session_dir.iterdir() if f.is_file()
-        ) if self.session_dir else 0
+        # Calculate total size (DirEntry caches type info from the directory read)
+        try:
+            total_size = sum(
+                e.stat().st_size for e in _scan_files(self.session_dir)
+            ) if self.session_dir else 0
+        except OSError:
+            total_size = 0
         size_mb = total_size / (1024 * 1024)
         
         # Update UI
@@ -543,64 +658,136 @@ class RecorderApp(rumps.App):
         self.session_dir = None
         self.start_time = None
         self._reference_time = None
+        
+        # Normal stop already cleaned up; don't run it again at exit
+        atexit.unregister(self._cleanup_on_exit)
     
     def _log_event(self, event_type: str, data: dict):
-        """Log an event with timestamp (buffered for performance)."""
-        event = {
-            "ts": time.time_ns(),
-            "ts_monotonic": time.monotonic_ns(),  # P0 fix: add monotonic timestamp
-            "type": event_type,
-            **data
-        }
+        """Log an event with timestamp (queued for the writer thread).
         
-        with self._event_buffer_lock:
-            # P1 fix (Memory): enforce buffer limit to prevent OOM
-            if len(self._event_buffer) >= MAX_EVENT_BUFFER:
-                # Keep recording events, drop oldest regular events
-                important = [e for e in self._event_buffer if e.get('type') == 'recording']
-                self._event_buffer = important[-100:] + self._event_buffer[-MAX_EVENT_BUFFER//2:]
-                logger.warning(f"Event buffer overflow, dropped old events")
+        Takes ownership of data: timestamps are added to it in place rather
+        than copied into a new dict.
+        """
+        event = data
+        event["ts"] = time.time_ns()
+        event["ts_monotonic"] = time.monotonic_ns()  # P0 fix: add monotonic timestamp
+        event["type"] = event_type
+        
+        # O(1) hand-off: callers never block on disk I/O
+        try:
+            self._event_queue.put_nowait(event)
+        except queue.Full:
+            # P1 fix (Memory): bounded queue; never drop start/stop markers
+            if event_type == "recording":
+                self._event_queue.put(event)
+            else:
+                logger.warning("Event queue full, dropped event")
+    
+    def _start_writer(self):
+        """Start the background thread that writes queued events to disk."""
+        self._event_queue = queue.Queue(maxsize=MAX_EVENT_BUFFER)
+        # The writer owns this session's queue and file, so a writer that
+        # outlives stop_recording never touches the next session's
+        self._writer_thread = threading.Thread(
+            target=self._writer_loop,
+            args=(self._event_queue, self.event_file),
+            daemon=True,
+        )
+        self._writer_thread.start()
+    
+    def _stop_writer(self) -> bool:
+        """Drain remaining events and stop the writer thread.
+        
+        Returns False if the writer is still running after the timeout; it
+        then closes the event file itself once it catches up.
+        """
+        if not self._writer_thread:
+            return True
+        self._event_queue.put(_WRITER_STOP)
+        self._writer_thread.join(timeout=5)
+        finished = not self._writer_thread.is_alive()
+        if not finished:
+            logger.warning("Event writer thread did not terminate in time")
+        self._writer_thread = None
+        return finished
+    
+    def _writer_loop(self, q: queue.Queue, event_file):
+        """Batch queued events (up to 100 or 1 second) and write them out."""
+        pending = []  # events whose write failed, retried with the next batch
+        stopping = False
+        while not stopping:
+            event = q.get()
+            if event is _WRITER_STOP:
+                stopping = True
+            else:
+                batch = [event]
+                deadline = time.monotonic() + 1.0
+                # P0 fix: flush every 100 events, on important events, OR every 1 second
+                while len(batch) < 100 and event["type"] != "recording":
+                    try:
+                        # Cheap path first: no clock read while events are queued
+                        event = q.get_nowait()
+                    except queue.Empty:
+                        timeout = deadline - time.monotonic()
+                        if timeout <= 0:
+                            break
+                        try:
+                            event = q.get(timeout=timeout)
+                        except queue.Empty:
+                            break
+                    if event is _WRITER_STOP:
+                        stopping = True
+                        break
+                    batch.append(event)
+                pending.extend(batch)
             
-            self._event_buffer.append(event)
-            # P0 fix: flush every 100 events, on important events, OR every 1 second
-            should_flush = (
-                len(self._event_buffer) >= 100 or 
-                event_type == "recording" or  # Always flush start/stop
-                (time.monotonic() - getattr(self, '_last_flush_time', 0)) >= 1.0
-            )
+            if pending:
+                # Pay for durability only on start/stop markers and at shutdown
+                sync = stopping or pending[-1]["type"] == "recording"
+                pending = self._flush_events(pending, event_file, sync=sync)
+            
+            # P1 fix (Memory): cap retry backlog, keeping recording events
+            if len(pending) >= MAX_EVENT_BUFFER:
+                important = [e for e in pending if e.get('type') == 'recording']
+                pending = important[-100:] + pending[-MAX_EVENT_BUFFER//2:]
+                logger.warning(f"Event buffer overflow, dropped old events")
         
-        if should_flush:
-            self._flush_events()
+        if event_file:
+            try:
+                event_file.close()
+            except (IOError, OSError) as e:
+                logger.error(f"Failed to close event log: {e}")
     
-    def _flush_events(self):
-        """Flush buffered events to file with error recovery."""
-        if not self.event_file:
-            return
+    def _flush_events(self, events_to_write: list, event_file, sync: bool = False) -> list:
+        """Write a batch of events to event_file; return the events that failed.
         
-        # P1 fix (Concurrency): update _last_flush_time inside lock
-        with self._event_buffer_lock:
-            events_to_write = self._event_buffer.copy()
-            self._event_buffer.clear()
-            self._last_flush_time = time.monotonic()
+        Every batch is flushed to the OS; with sync=True it is also fsync'd.
+        """
+        if not event_file:
+            return events_to_write
         
-        # File I/O outside lock to avoid blocking
         failed_events = []
-        for event in events_to_write:
-            try:
-                self.event_file.write(json.dumps(event) + "\n")
-            except (IOError, OSError) as e:
-                logger.error(f"Failed to write event: {e}")
-                failed_events.append(event)
+        try:
+            # Single write per batch instead of one per event
+            payload = b"\n".join(map(dump_json, events_to_write))
+            event_file.write(payload + b"\n")
+        except (IOError, OSError) as e:
+            logger.warning(f"Batch write failed, retrying per event: {e}")
+            for event in events_to_write:
+                try:
+                    event_file.write(dump_json(event) + b"\n")
+                except (IOError, OSError) as e:
+                    logger.error(f"Failed to write event: {e}")
+                    failed_events.append(event)
         
         try:
-            self.event_file.flush()
+            event_file.flush()
+            if sync:
+                os.fsync(event_file.fileno())
         except (IOError, OSError) as e:
             logger.error(f"Failed to flush events: {e}")
         
-        # Re-add failed events to buffer for retry
-        if failed_events:
-            with self._event_buffer_lock:
-                self._event_buffer.extend(failed_events)
+        return failed_events
     
     def _on_bluetooth_event(self, device_name: str, rssi: int):
         """Callback for Bluetooth RSSI updates."""
@@ -612,33 +799,43 @@ class RecorderApp(rumps.App):
     def _update_duration(self, sender):
         """Update the duration and size display."""
         if self.recording and self.start_time:
-            elapsed = int(time.time() - self.start_time)
+            current_time = time.monotonic()
+            elapsed = int(current_time - self._start_monotonic)
             mins, secs = divmod(elapsed, 60)
             hours, mins = divmod(mins, 60)
             
-            if hours > 0:
-                duration_str = f"{hours:02d}:{mins:02d}:{secs:02d}"
-            else:
-                duration_str = f"{mins:02d}:{secs:02d}"
-            
-            self.duration_item.title = f"Duration: {duration_str}"
-            self.title = f"🔴 {mins:02d}:{secs:02d}"
+            # Each title assignment crosses the PyObjC bridge; skip if unchanged
+            shown = (hours, mins, secs)
+            if shown != self._last_shown:
+                self._last_shown = shown
+                mm_ss = "".join((_SS[mins], ":", _SS[secs]))
+                if hours > 0:
+                    duration_str = "".join((f"{hours:02d}", ":", mm_ss))
+                else:
+                    duration_str = mm_ss
+                
+                self.duration_item.title = "Duration: " + duration_str
+                self.title = "🔴 " + mm_ss
             
             # P0 fix: Update size only every 10 seconds to reduce I/O
-            current_time = time.time()
             if current_time - self._last_size_update >= 10:
                 self._last_size_update = current_time
-                if self.session_dir and self.session_dir.exists():
-                    try:
-                        self._cached_size = sum(
-                            f.stat().st_size for f in self.session_dir.iterdir() if f.is_file()
-                        )
-                    except:
-                        pass
+                try:
+                    self._cached_size = self._current_size()
+                except (IOError, OSError, ValueError):
+                    pass
             
             size_mb = self._cached_size / (1024 * 1024)
             self.size_item.title = f"Size: {size_mb:.1f} MB"
     
+    def _current_size(self) -> int:
+        """Sum bytes written by active recorders without walking session_dir."""
+        recorders = (self.screen_recorder, self.audio_recorder, self.mic_recorder)
+        total = sum(r.bytes_written for r in recorders if r)
+        if self.event_file:
+            total += self.event_file.tell()
+        return total
+    
     def open_settings(self, sender):
         """Open config file for editing."""
         config_path = Path(__file__).parent / "config.yaml"
@@ -680,6 +877,7 @@ class RecorderApp(rumps.App):
                 return
             self.stop_recording()
         
+        self._flush_persist()
         rumps.quit_application()
 
 
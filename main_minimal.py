@@ -2,17 +2,160 @@
 """macOS Screen Recorder - Karpathy-style minimal implementation."""
 
 import rumps
+import os
 import subprocess
+import ctypes
 import time
 import json
 import asyncio
+import re
+import fcntl
+import queue
 import threading
 from pathlib import Path
-from datetime import datetime
+
+try:
+    from AppKit import NSSound  # ships with PyObjC, which rumps depends on
+except ImportError:
+    NSSound = None
+
+try:
+    import orjson
+    dumps = orjson.dumps
+except ImportError:
+    def dumps(obj):
+        return json.dumps(obj).encode()
 
 # Config - that's it. No YAML.
 OUTPUT_DIR = Path.home() / "Recordings"
+OUTPUT_DIR.mkdir(exist_ok=True)
 FPS = 30
+BT_BUF_SIZE = 64 * 1024  # write Bluetooth log in ~64KB blocks
+BT_FLUSH_INTERVAL = 1.0  # writer flushes at least this often; bounds data loss
+BT_MIN_INTERVAL = 1.0  # log a device at most once per second...
+BT_MIN_DELTA = 3  # ...unless RSSI moved by at least this many dBm
+BT_PRUNE_AGE = 30  # seconds before an idle device is forgotten
+BT_BATCH_WINDOW = 0.2  # adverts are encoded together once per window
+BT_FORMAT = os.environ.get("REC_BT_FORMAT", "jsonl")  # "msgpack" = compact binary log
+
+USE_HEVC = os.environ.get("USE_HEVC", "1") != "0"  # USE_HEVC=0 for Macs without HEVC encode
+NOCACHE = os.environ.get("REC_NOCACHE") == "1"  # keep recordings out of the page cache
+F_NOCACHE = getattr(fcntl, "F_NOCACHE", 48)  # macOS value; not exported by older Pythons
+
+
+def input_queue(frames):
+    """Bound ffmpeg's per-input packet queue so a stalled disk can't pile raw frames up in RAM."""
+    return ["-thread_queue_size", str(frames)]
+
+
+def video_args(quality, bitrate):
+    """HEVC constant-quality (hvc1 tag for QuickTime), or the old H.264 bitrate target."""
+    if USE_HEVC:
+        return ["-c:v", "hevc_videotoolbox", "-q:v", str(quality), "-tag:v", "hvc1"]
+    return ["-c:v", "h264_videotoolbox", "-b:v", bitrate]
+
+
+_sounds = {}  # name -> NSSound, kept alive so playback isn't cut short
+
+
+def play(name):
+    """Play a system sound without blocking the menu bar."""
+    path = f"/System/Library/Sounds/{name}.aiff"
+    if NSSound is not None:
+        sound = _sounds.get(name) or NSSound.alloc().initWithContentsOfFile_byReference_(path, True)
+        if sound:
+            _sounds[name] = sound
+            sound.stop()  # rewind if still playing from last time
+            sound.play()
+            return
+    # Absolute path + close_fds=False: spawned via posix_spawn, not fork+exec
+    subprocess.Popen(["/usr/bin/afplay", path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                     close_fds=False)
+
+
+def prevent_sleep():
+    """Hold the IOPM assertions `caffeinate -dims` would, in-process. Returns their ids ([] = failed)."""
+    try:
+        cf = ctypes.CDLL("/System/Library/Frameworks/CoreFoundation.framework/CoreFoundation")
+        iokit = ctypes.CDLL("/System/Library/Frameworks/IOKit.framework/IOKit")
+    except OSError:
+        return []
+    cf.CFStringCreateWithCString.restype = ctypes.c_void_p
+    cf.CFStringCreateWithCString.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_uint32]
+    cf.CFRelease.argtypes = [ctypes.c_void_p]
+    iokit.IOPMAssertionCreateWithName.argtypes = [
+        ctypes.c_void_p, ctypes.c_uint32, ctypes.c_void_p, ctypes.POINTER(ctypes.c_uint32)]
+    cfstr = lambda b: cf.CFStringCreateWithCString(None, b, 0x08000100)  # UTF-8
+    name, ids = cfstr(b"Recording"), []
+    for kind in (b"PreventUserIdleDisplaySleep", b"PreventUserIdleSystemSleep", b"PreventSystemSleep"):
+        kind_str, aid = cfstr(kind), ctypes.c_uint32(0)
+        ok = iokit.IOPMAssertionCreateWithName(kind_str, 255, name, ctypes.byref(aid)) == 0  # 255 = level on
+        cf.CFRelease(kind_str)
+        if not ok:
+            allow_sleep(ids)
+            ids = []
+            break
+        ids.append(aid.value)
+    cf.CFRelease(name)
+    return ids
+
+
+def allow_sleep(ids):
+    if ids:
+        iokit = ctypes.CDLL("/System/Library/Frameworks/IOKit.framework/IOKit")
+        for aid in ids:
+            iokit.IOPMAssertionRelease(ctypes.c_uint32(aid))
+
+
+def probe_devices():
+    """One ffmpeg -list_devices call: screen/camera/mic indices and BlackHole presence.
+
+    camera and mic stay None unless listed; a guessed index can be another device (even a screen).
+    """
+    # Default: Capture screen 0 = index 4 on a MacBook Pro with its built-in camera and mic
+    devices = {"screen": "4", "camera": None, "mic": None, "blackhole": False}
+    try:
+        result = subprocess.run(
+            ["ffmpeg", "-f", "avfoundation", "-list_devices", "true", "-i", ""],
+            capture_output=True, text=True, timeout=5
+        )
+    except Exception:
+        return devices
+    found, section = set(), None
+    for line in result.stderr.splitlines():
+        if "video devices" in line:
+            section = "video"
+        elif "audio devices" in line:
+            section = "audio"
+        elif section and (m := re.search(r"\[(\d+)\] (.+)$", line)):
+            idx, name = m.groups()
+            if section == "video":
+                key = "screen" if name.startswith("Capture screen") else "camera"
+            elif "BlackHole" in name:
+                devices["blackhole"] = True
+                continue
+            else:
+                key = "mic"
+            if key not in found:
+                found.add(key)
+                devices[key] = idx
+    return devices
+
+
+if BT_FORMAT == "msgpack":
+    # Length-prefixed records: 4-byte little-endian size + msgpack payload.
+    # Read back with tools/replay.py.
+    import msgpack
+    BT_FILENAME = "bluetooth.msgpack"
+
+    def encode_record(event):
+        rec = msgpack.packb(event, use_bin_type=True)
+        return len(rec).to_bytes(4, "little") + rec
+else:
+    BT_FILENAME = "bluetooth.jsonl"
+
+    def encode_record(event):
+        return dumps(event) + b"\n"
 
 
 class Recorder(rumps.App):
@@ -20,11 +163,25 @@ class Recorder(rumps.App):
         super().__init__("⚫", quit_button=None)
         self.recording = False
         self.processes = []
+        self.assertions = []  # IOPM assertion ids held while recording
         self.session_dir = None
         self.start_time = None
+        self.last_elapsed = -1
         self.bt_file = None
+        self.bt_queue = None  # encoded records -> bt_writer thread
+        self.bt_writer = None
         self.bt_thread = None
         self.bt_running = False
+        self.bt_loop = None
+        self.bt_stop = None
+        self.bt_pending = []  # adverts waiting for the next batch window
+        self.md_cache = {}  # address -> (raw manufacturer_data, hex-encoded form)
+        self.bt_last = {}  # address -> (monotonic time, rssi) of last logged advert
+        
+        # Probe capture devices once, off the UI thread
+        self.devices = None
+        self.probe_thread = threading.Thread(target=self._probe, daemon=True)
+        self.probe_thread.start()
         
         self.toggle_item = rumps.MenuItem("▶️ 녹화 시작", callback=self.toggle, key="r")
         self.menu = [
@@ -35,6 +192,31 @@ class Recorder(rumps.App):
         ]
         
         self.timer = rumps.Timer(self.update_title, 1)
+        self.prune_timer = rumps.Timer(self.prune_bt, BT_PRUNE_AGE)
+    
+    def _ffmpeg(self, inputs, outputs):
+        """Launch one ffmpeg for these inputs; each output goes to a descriptor we open (and tune) first."""
+        args, fds = ["ffmpeg", "-y", *inputs], []
+        try:
+            for out_args, path in outputs:
+                fd = os.open(path, os.O_CREAT | os.O_WRONLY | os.O_TRUNC, 0o644)
+                fds.append(fd)
+                if NOCACHE:
+                    # Set on the open file itself, so ffmpeg's /dev/fd dup inherits it
+                    try:
+                        fcntl.fcntl(fd, F_NOCACHE, 1)
+                    except OSError:
+                        pass
+                args += [*out_args, "-f", "mp4", f"/dev/fd/{fd}"]
+            self.processes.append(subprocess.Popen(
+                args, pass_fds=fds,
+                stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+        finally:
+            for fd in fds:
+                os.close(fd)
+    
+    def _probe(self):
+        self.devices = probe_devices()
     
     def toggle(self, _):
         if self.recording:
@@ -43,85 +225,79 @@ class Recorder(rumps.App):
             self.start()
     
     def start(self):
-        OUTPUT_DIR.mkdir(exist_ok=True)
-        ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+        ts = time.strftime("%Y%m%d_%H%M%S")
         self.session_dir = OUTPUT_DIR / f"rec_{ts}"
-        self.session_dir.mkdir()
+        self.session_dir.mkdir(parents=True)  # parents only matter if OUTPUT_DIR was deleted
+        self.probe_thread.join(timeout=5)  # normally finished long ago
+        dev = self.devices or probe_devices()
         
-        # Screen recording (Capture screen 0 = index 4)
-        self.processes.append(subprocess.Popen([
-            "ffmpeg", "-y", "-f", "avfoundation",
-            "-capture_cursor", "1", "-framerate", str(FPS),
-            "-i", "4:none",
-            "-c:v", "h264_videotoolbox", "-b:v", "5M",
-            str(self.session_dir / "screen.mp4")
-        ], stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
-
-        # Camera recording (MacBook Pro 카메라 = index 0)
-        self.processes.append(subprocess.Popen([
-            "ffmpeg", "-y", "-f", "avfoundation",
-            "-video_size", "1920x1080",
-            "-framerate", str(FPS),
-            "-i", "0:none",
-            "-c:v", "h264_videotoolbox", "-b:v", "3M",
-            str(self.session_dir / "camera.mp4")
-        ], stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
-
-        # Microphone recording (MacBook Pro 마이크 = index 0, volume boost 3x)
-        self.processes.append(subprocess.Popen([
-            "ffmpeg", "-y", "-f", "avfoundation",
-            "-i", ":0",
-            "-af", "volume=5.0",
-            "-c:a", "aac", "-b:a", "128k",
-            str(self.session_dir / "mic.m4a")
-        ], stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+        # Screen in its own ffmpeg: a camera or mic that fails to open can't take it down
+        self._ffmpeg([
+            "-f", "avfoundation", "-capture_cursor", "1", "-framerate", str(FPS),
+            "-pixel_format", "nv12",  # encoder-native, so no conversion; falls back if unsupported
+            *input_queue(FPS),  # ~1s of raw screen frames
+            "-i", f"{dev['screen']}:none",
+        ], [(["-map", "0:v", *video_args(50, "5M")], self.session_dir / "screen.mp4")])
 
+        # Peripherals the probe found share a second ffmpeg: one process, one clock.
+        # One output per input, so input i is mapped by output i.
+        inputs, outputs = [], []
+        if dev["camera"] is not None:
+            inputs += ["-f", "avfoundation", "-video_size", "1920x1080", "-framerate", str(FPS),
+                       *input_queue(64), "-i", f"{dev['camera']}:none"]
+            outputs.append((["-map", f"{len(outputs)}:v", *video_args(55, "3M")],
+                            self.session_dir / "camera.mp4"))
+        if dev["mic"] is not None:
+            inputs += ["-f", "avfoundation", *input_queue(64), "-i", f":{dev['mic']}"]
+            # Microphone volume boost 5x
+            outputs.append((["-map", f"{len(outputs)}:a", "-af", "volume=5.0", "-c:a", "aac", "-b:a", "128k"],
+                            self.session_dir / "mic.m4a"))
         # System audio (if BlackHole available)
-        try:
-            result = subprocess.run(
-                ["ffmpeg", "-f", "avfoundation", "-list_devices", "true", "-i", ""],
-                capture_output=True, text=True, timeout=5
-            )
-            if "BlackHole" in result.stderr:
-                self.processes.append(subprocess.Popen([
-                    "ffmpeg", "-y", "-f", "avfoundation",
-                    "-i", ":BlackHole 2ch",
-                    "-c:a", "aac", "-b:a", "128k",
-                    str(self.session_dir / "audio.m4a")
-                ], stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
-        except:
-            pass
+        if dev["blackhole"]:
+            inputs += ["-f", "avfoundation", *input_queue(64), "-i", ":BlackHole 2ch"]
+            outputs.append((["-map", f"{len(outputs)}:a", "-c:a", "aac", "-b:a", "128k"],
+                            self.session_dir / "audio.m4a"))
+        if outputs:
+            self._ffmpeg(inputs, outputs)
         
-        # Prevent sleep
-        self.processes.append(subprocess.Popen(["caffeinate", "-dims"]))
-
-        # Wait for ffmpeg to actually start recording
-        mp4_path = self.session_dir / "screen.mp4"
-        for _ in range(50):  # up to 5 seconds
-            time.sleep(0.1)
-            if mp4_path.exists() and mp4_path.stat().st_size > 0:
-                break
+        # Prevent sleep: IOPM assertions in-process, caffeinate only if that fails
+        self.assertions = prevent_sleep()
+        if not self.assertions:
+            self.processes.append(subprocess.Popen(["/usr/bin/caffeinate", "-dims"], close_fds=False))
 
         # Bluetooth log
-        self.bt_file = open(self.session_dir / "bluetooth.jsonl", "w")
+        self.bt_file = open(self.session_dir / BT_FILENAME, "wb", buffering=BT_BUF_SIZE)
+        self.bt_queue = queue.SimpleQueue()
+        self.bt_writer = threading.Thread(target=self._bt_write_loop, daemon=True)
+        self.bt_writer.start()
         self.log_bt({"type": "start"})
 
         # Bluetooth monitoring
         self.bt_running = True
+        self.bt_loop = asyncio.new_event_loop()
+        self.bt_stop = asyncio.Event()
         self.bt_thread = threading.Thread(target=self._bt_monitor, daemon=True)
         self.bt_thread.start()
         
         self.recording = True
         self.start_time = time.time()
+        self.last_elapsed = -1
         self.toggle_item.title = "⏹️ 녹화 중지"
         self.title = "🔴"
         self.timer.start()
+        self.prune_timer.start()
         
-        subprocess.run(["afplay", "/System/Library/Sounds/Blow.aiff"], capture_output=True)
+        play("Blow")
     
     def stop(self):
         self.timer.stop()
+        self.prune_timer.stop()
         self.bt_running = False
+        try:
+            self.bt_loop.call_soon_threadsafe(self.bt_stop.set)
+        except RuntimeError:
+            pass  # loop already closed (bleak missing)
+        self.bt_thread.join(timeout=2)  # let the last batch land before "stop"
         self.log_bt({"type": "stop", "duration": time.time() - self.start_time})
 
         # Stop all processes
@@ -138,27 +314,62 @@ class Recorder(rumps.App):
                 except:
                     p.kill()
         self.processes = []
+        allow_sleep(self.assertions)
+        self.assertions = []
         
-        if self.bt_file:
-            self.bt_file.close()
-            self.bt_file = None
+        self.bt_queue.put(None)  # writer exits after draining everything before it
+        self.bt_writer.join(timeout=5)
+        lagging = self.bt_writer.is_alive()  # it still owns bt_file and closes it when done
+        self.bt_file = None
         
         self.recording = False
         self.toggle_item.title = "▶️ 녹화 시작"
         self.title = "⚫"
         
-        subprocess.run(["afplay", "/System/Library/Sounds/Glass.aiff"], capture_output=True)
-        rumps.notification("녹화 완료", "", str(self.session_dir.name))
+        play("Glass")
+        rumps.notification("녹화 완료", "BT 로그 저장 중" if lagging else "", str(self.session_dir.name))
     
     def log_bt(self, data: dict):
-        if self.bt_file:
-            event = {"ts": time.time_ns(), **data}
-            self.bt_file.write(json.dumps(event) + "\n")
-            self.bt_file.flush()
+        self.log_bt_batch([{"ts": time.time_ns(), **data}])
+    
+    def log_bt_batch(self, events):
+        self.bt_queue.put(b"".join(map(encode_record, events)))
+    
+    def _bt_write_loop(self):
+        """Drain bt_queue into bt_file so producers never wait on disk."""
+        f, q = self.bt_file, self.bt_queue
+        last_flush = time.monotonic()
+        done = False
+        while not done:
+            batch = []
+            try:
+                batch.append(q.get(timeout=BT_FLUSH_INTERVAL))
+                while True:
+                    batch.append(q.get_nowait())
+            except queue.Empty:
+                pass
+            if batch and batch[-1] is None:  # stop sentinel is always the last put
+                batch.pop()
+                done = True
+            f.write(b"".join(batch))
+            now = time.monotonic()
+            if done or now - last_flush >= BT_FLUSH_INTERVAL:
+                f.flush()
+                last_flush = now
+        os.fsync(f.fileno())  # once per session, not per event
+        f.close()
+    
+    def prune_bt(self, _):
+        # Forget devices not logged recently so bt_last stays bounded
+        cutoff = time.monotonic() - BT_PRUNE_AGE
+        self.bt_last = {a: v for a, v in list(self.bt_last.items()) if v[0] >= cutoff}
     
     def update_title(self, _):
         if self.recording and self.start_time:
             elapsed = int(time.time() - self.start_time)
+            if elapsed == self.last_elapsed:
+                return  # same second; skip the Cocoa title update
+            self.last_elapsed = elapsed
             h, remainder = divmod(elapsed, 3600)
             m, s = divmod(remainder, 60)
             if h > 0:
@@ -174,34 +385,71 @@ class Recorder(rumps.App):
             self.stop()
         rumps.quit_application()
     
+    def _manufacturer_data(self, address, md):
+        """Manufacturer data in log form, reusing the last hex result per device."""
+        if not md:
+            return {}
+        if BT_FORMAT == "msgpack":
+            return md  # msgpack stores int keys and raw bytes natively
+        cached = self.md_cache.get(address)
+        if cached and cached[0] == md:
+            return cached[1]
+        if len(self.md_cache) >= 256:
+            self.md_cache.clear()
+        hexed = {str(k): v.hex() for k, v in md.items()}
+        self.md_cache[address] = (dict(md), hexed)
+        return hexed
+    
     def _bt_monitor(self):
         """Bluetooth RSSI monitoring - minimal version."""
         try:
             from bleak import BleakScanner
         except ImportError:
+            self.bt_loop.close()
             return  # No bleak? Skip it.
         
         def on_detection(device, advertisement_data):
             if not self.bt_running:
                 return
-            self.log_bt({
+            # Debounce: skip near-identical adverts from the same device
+            address, rssi = device.address, advertisement_data.rssi
+            now = time.monotonic()
+            prev = self.bt_last.get(address)
+            if prev and now - prev[0] < BT_MIN_INTERVAL and abs(prev[1] - rssi) < BT_MIN_DELTA:
+                return
+            self.bt_last[address] = (now, rssi)
+            if not self.bt_pending:
+                loop.call_later(BT_BATCH_WINDOW, drain)  # first advert opens the window
+            self.bt_pending.append({
+                "ts": time.time_ns(),
                 "name": device.name or advertisement_data.local_name or "Unknown",
-                "address": device.address,
-                "rssi": advertisement_data.rssi,
+                "address": address,
+                "rssi": rssi,
                 "tx_power": advertisement_data.tx_power,
                 "service_uuids": advertisement_data.service_uuids or [],
-                "manufacturer_data": {str(k): v.hex() for k, v in advertisement_data.manufacturer_data.items()} if advertisement_data.manufacturer_data else {},
+                "manufacturer_data": self._manufacturer_data(device.address, advertisement_data.manufacturer_data),
             })
 
+        def drain():
+            # Callbacks run on this loop too, so the swap can't race an append
+            if self.bt_pending:
+                pending, self.bt_pending = self.bt_pending, []
+                self.log_bt_batch(pending)
+        
         async def scan():
             scanner = BleakScanner(detection_callback=on_detection)
             await scanner.start()
-            while self.bt_running:
-                await asyncio.sleep(0.5)
+            await self.bt_stop.wait()  # set from stop(); no idle wakeups
             await scanner.stop()
+            drain()
         
-        loop = asyncio.new_event_loop()
+        loop = self.bt_loop
         asyncio.set_event_loop(loop)
+        try:
+            # QOS_CLASS_UTILITY: let the encoder win when the CPU is busy
+            ctypes.CDLL(None).pthread_set_qos_class_self_np(0x11, 0)
+        except (OSError, AttributeError):
+            pass
         try:
             loop.run_until_complete(scan())
         finally:
@@ -12,26 +12,93 @@ Improvements based on expert review:
 """
 
 import subprocess
+import sys
 import threading
 import time
 import json
 import os
 import asyncio
+import copy
+import fcntl
+import functools
 import hashlib
 import logging
+import queue
+import re
+import selectors
+import shutil
+import signal
+import struct
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Callable, Optional
-from datetime import datetime
-from ctypes import cdll, c_uint32, byref
+from ctypes import CDLL, cdll, c_char_p, c_int32, c_uint32, c_void_p, byref, POINTER
 
-import numpy as np
-import yaml
+try:
+    import orjson  # Optional: C-accelerated JSON serialization
+except ImportError:
+    orjson = None
+
+try:
+    import uvloop  # Optional: libuv-based asyncio loop for the Bluetooth thread
+except ImportError:
+    uvloop = None
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def dump_json(obj, indent: bool = False) -> bytes:
+    """Serialize obj to UTF-8 JSON bytes (orjson when available)."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    if indent:
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode()
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def load_json(data: bytes):
+    """Parse JSON bytes (orjson when available)."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+QOS_CLASS_UTILITY = 0x11  # <sys/qos.h>
+F_NOCACHE = getattr(fcntl, "F_NOCACHE", 48)  # <sys/fcntl.h>; not exported by older Pythons
+F_PREALLOCATE = getattr(fcntl, "F_PREALLOCATE", 42)
+F_ALLOCATECONTIG, F_ALLOCATEALL, F_PEOFPOSMODE = 0x2, 0x4, 3
+
+
+def preallocate(fd: int, length: int) -> bool:
+    """Reserve length more bytes past the physical end of fd (macOS F_PREALLOCATE).
+    
+    Only disk blocks are reserved; the file size is untouched, and unused
+    space is given back when the file is closed.
+    """
+    if sys.platform != "darwin":
+        return False
+    for flags in (F_ALLOCATECONTIG | F_ALLOCATEALL, F_ALLOCATEALL):  # contiguous if possible
+        fstore = struct.pack("Iiqqq", flags, F_PEOFPOSMODE, 0, length, 0)
+        try:
+            fcntl.fcntl(fd, F_PREALLOCATE, fstore)
+            return True
+        except OSError:
+            continue
+    return False
+
+
+def lower_thread_qos():
+    """Demote the calling thread to QOS_CLASS_UTILITY so capture/encode threads win under load."""
+    try:
+        CDLL(None).pthread_set_qos_class_self_np(QOS_CLASS_UTILITY, 0)
+    except (OSError, AttributeError):
+        pass  # not macOS
+
+
+@functools.lru_cache(maxsize=1)
 def get_macos_version() -> tuple:
     """Get macOS version as tuple (major, minor)."""
     import platform
@@ -44,7 +111,10 @@ def get_macos_version() -> tuple:
 class PermissionChecker:
     """macOS 권한 상태 확인"""
     
+    # check_* results are cached; invalidate() after sending the user to grant access
+    
     @staticmethod
+    @functools.lru_cache(maxsize=1)
     def check_screen_recording() -> bool:
         """화면 녹화 권한 확인 (macOS 10.15+)"""
         try:
@@ -62,6 +132,7 @@ class PermissionChecker:
             return False
     
     @staticmethod
+    @functools.lru_cache(maxsize=1)
     def check_microphone() -> bool:
         """마이크 권한 확인"""
         try:
@@ -73,6 +144,13 @@ class PermissionChecker:
         except:
             return True  # 확인 불가 시 True 가정
     
+    @classmethod
+    def invalidate(cls):
+        """캐시된 권한 확인 결과 초기화"""
+        cls.check_screen_recording.cache_clear()
+        cls.check_microphone.cache_clear()
+        cls.check_bluetooth.cache_clear()
+    
     @staticmethod
     def request_screen_recording():
         """화면 녹화 권한 요청"""
@@ -81,6 +159,7 @@ class PermissionChecker:
             CGRequestScreenCaptureAccess()
         except:
             pass
+        PermissionChecker.invalidate()
     
     @staticmethod
     def open_privacy_settings(pane: str = "screen"):
@@ -91,8 +170,10 @@ class PermissionChecker:
             "bluetooth": "x-apple.systempreferences:com.apple.preference.security?Privacy_Bluetooth",
         }
         subprocess.run(["open", urls.get(pane, urls["screen"])])
+        PermissionChecker.invalidate()  # 사용자가 권한을 바꿀 수 있음
     
     @staticmethod
+    @functools.lru_cache(maxsize=1)
     def check_bluetooth() -> bool:
         """Bluetooth 권한 확인 (macOS 10.15+)"""
         try:
@@ -108,19 +189,27 @@ class PermissionChecker:
     @staticmethod
     def validate_all() -> dict:
         """모든 권한 상태 확인"""
-        return {
-            "screen_recording": PermissionChecker.check_screen_recording(),
-            "microphone": PermissionChecker.check_microphone(),
-            "bluetooth": PermissionChecker.check_bluetooth(),
-        }
+        # Quartz/AVFoundation 첫 로드가 느리므로 두 확인을 동시에 실행
+        with ThreadPoolExecutor(max_workers=2) as ex:
+            screen = ex.submit(PermissionChecker.check_screen_recording)
+            microphone = ex.submit(PermissionChecker.check_microphone)
+            return {
+                "screen_recording": screen.result(),
+                "microphone": microphone.result(),
+                "bluetooth": PermissionChecker.check_bluetooth(),
+            }
 
 
 class SleepInhibitor:
     """Prevents macOS from sleeping and App Nap during recording."""
     
+    # Same coverage as `caffeinate -dims` (disk idle sleep has no separate assertion)
+    ASSERTION_TYPES = (b"PreventUserIdleDisplaySleep", b"PreventUserIdleSystemSleep", b"PreventSystemSleep")
+    
     def __init__(self, reason: str = "Recording in progress"):
         self.reason = reason
-        self.assertion_id = None
+        self.assertion_ids = []  # IOPM assertions held directly
+        self._iokit = None
         self._process = None  # Fallback to caffeinate
         self._activity = None  # App Nap prevention
     
@@ -137,12 +226,23 @@ class SleepInhibitor:
         except Exception as e:
             logger.warning(f"App Nap prevention failed: {e}")
         
-        # 2. Prevent system sleep via caffeinate
+        # 2. Prevent system sleep via IOKit power assertions, caffeinate as fallback
+        try:
+            self._create_assertions()
+            logger.info("Sleep prevention started (IOPMAssertion)")
+            return
+        except Exception as e:
+            self._release_assertions()
+            logger.warning(f"IOPMAssertion failed, falling back to caffeinate: {e}")
+        
         try:
+            # Absolute path + close_fds=False (our fds are non-inheritable anyway)
+            # lets subprocess use posix_spawn instead of fork+exec
             self._process = subprocess.Popen(
-                ["caffeinate", "-dims"],
+                ["/usr/bin/caffeinate", "-dims"],
                 stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL
+                stderr=subprocess.DEVNULL,
+                close_fds=False
             )
             logger.info("Sleep prevention started (caffeinate)")
         except Exception as e:
@@ -160,6 +260,11 @@ class SleepInhibitor:
                 pass
             self._activity = None
         
+        # Release power assertions
+        if self.assertion_ids:
+            self._release_assertions()
+            logger.info("Sleep prevention stopped")
+        
         # Stop caffeinate
         if self._process:
             self._process.terminate()
@@ -169,69 +274,297 @@ class SleepInhibitor:
                 self._process.kill()
             self._process = None
             logger.info("Sleep prevention stopped")
+    
+    def _create_assertions(self):
+        """Hold IOPM assertions in-process instead of running a caffeinate child."""
+        cf = cdll.LoadLibrary("/System/Library/Frameworks/CoreFoundation.framework/CoreFoundation")
+        iokit = cdll.LoadLibrary("/System/Library/Frameworks/IOKit.framework/IOKit")
+        cf.CFStringCreateWithCString.restype = c_void_p
+        cf.CFStringCreateWithCString.argtypes = [c_void_p, c_char_p, c_uint32]
+        cf.CFRelease.argtypes = [c_void_p]
+        iokit.IOPMAssertionCreateWithName.restype = c_int32
+        iokit.IOPMAssertionCreateWithName.argtypes = [c_void_p, c_uint32, c_void_p, POINTER(c_uint32)]
+        iokit.IOPMAssertionRelease.argtypes = [c_uint32]
+        self._iokit = iokit
+        
+        def cfstr(value: bytes):
+            return cf.CFStringCreateWithCString(None, value, 0x08000100)  # kCFStringEncodingUTF8
+        
+        name = cfstr(self.reason.encode())
+        try:
+            for assertion_type in self.ASSERTION_TYPES:
+                type_str = cfstr(assertion_type)
+                assertion_id = c_uint32(0)
+                try:
+                    # 255 = kIOPMAssertionLevelOn
+                    result = iokit.IOPMAssertionCreateWithName(type_str, 255, name, byref(assertion_id))
+                finally:
+                    cf.CFRelease(type_str)
+                if result != 0:
+                    raise OSError(f"IOPMAssertionCreateWithName({assertion_type.decode()}) returned {result:#x}")
+                self.assertion_ids.append(assertion_id.value)
+        finally:
+            cf.CFRelease(name)
+    
+    def _release_assertions(self):
+        for assertion_id in self.assertion_ids:
+            try:
+                self._iokit.IOPMAssertionRelease(assertion_id)
+            except Exception:
+                pass
+        self.assertion_ids = []
 
 
 class ScreenRecorder:
     """Records screen using ffmpeg with avfoundation."""
     
-    # Class-level ffmpeg availability cache
+    # Class-level ffmpeg availability / encoder list caches
     _ffmpeg_available = None
+    _encoders = None
+    _quality_mode = {}  # encoder -> whether VideoToolbox accepts -q:v here
+    
+    ENCODERS = {"h264": "h264_videotoolbox", "hevc": "hevc_videotoolbox"}
+    DEFAULT_QUALITY = {"h264": 65, "hevc": 50}  # VideoToolbox -q:v, roughly equal visual quality
+    DEFAULT_BITRATE = {"h264": "5M", "hevc": "3M"}  # where -q:v is unavailable (Intel Macs)
+    
+    # Fixed parts of the ffmpeg command; start() only fills in the per-session slots
+    _CMD_CAPTURE = ("ffmpeg", "-y", "-loglevel", "error", "-f", "avfoundation", "-capture_cursor", "1")
+    _CMD_ENCODE = (
+        "-prio_speed", "1",
+        "-allow_sw", "0",  # fail rather than silently fall back to a software encoder
+        "-pix_fmt", "nv12",
+    )
+    _CMD_FRAGMENTED = ("-movflags", "+frag_keyframe+empty_moov+default_base_moof", "-f", "mp4")
+    # frag_keyframe only cuts on video keyframes; audio-only outputs would otherwise
+    # hold every fragment in ffmpeg's memory until exit
+    _CMD_FRAG_AUDIO = ("-frag_duration", "1000000")  # 1s, in microseconds
+    START_CHECK = 0.5  # seconds; an input that can't be opened ends ffmpeg well within this
     
-    def __init__(self, output_path: Path, fps: int = 30, monitor_idx: int = 1):
+    def __init__(self, output_path: Path, fps: int = 30, monitor_idx: int = 1,
+                 quality: Optional[int] = None, realtime: bool = True, codec: str = "auto",
+                 bitrate: Optional[str] = None, audio_outputs: Optional[list] = None):
+        """codec is "hevc", "h264" or "auto" (HEVC when this ffmpeg has hevc_videotoolbox).
+        
+        quality is VideoToolbox -q:v (1-100, Apple Silicon; default per codec).
+        bitrate (e.g. "5M") selects bitrate mode instead. Without either, quality
+        mode is used where VideoToolbox supports it and DEFAULT_BITRATE elsewhere.
+        audio_outputs: (avfoundation audio device, path) pairs captured by the
+        same ffmpeg process as AAC, on the same clock as the video. One that
+        fails to open is dropped (see start()); audio_outputs then lists the rest.
+        """
+        if codec != "auto" and codec not in self.ENCODERS:
+            raise ValueError(f"Unsupported codec: {codec}")
         self.output_path = output_path
         self.fps = fps
         self.monitor_idx = monitor_idx
+        self.quality = quality
+        self.bitrate = bitrate
+        self.realtime = realtime
+        self.codec = codec
+        self.audio_outputs = list(audio_outputs or [])
         self.process = None
         self.recording = False
         self._error = None
     
+    @staticmethod
+    def list_audio_devices() -> list:
+        """Names of avfoundation audio input devices (one ffmpeg -list_devices call)."""
+        try:
+            result = subprocess.run(
+                ["ffmpeg", "-f", "avfoundation", "-list_devices", "true", "-i", ""],
+                capture_output=True, text=True, timeout=5
+            )
+        except Exception:
+            return []
+        _, _, audio = result.stderr.partition("audio devices:")
+        return [line.split("] ", 2)[-1] for line in audio.splitlines() if "] [" in line]
+    
+    @classmethod
+    def _probe_capabilities(cls):
+        """One `ffmpeg -encoders` run answers both "is ffmpeg there" and "which encoders"."""
+        try:
+            out = subprocess.run(
+                ["ffmpeg", "-hide_banner", "-encoders"],
+                capture_output=True, text=True, timeout=5, check=True
+            ).stdout
+        except Exception:
+            cls._ffmpeg_available, cls._encoders = False, frozenset()
+            return
+        # Encoder rows follow the " ------" separator: " V....D name  description"
+        _, _, rows = out.partition("------")
+        cls._encoders = frozenset(fields[1] for fields in map(str.split, rows.splitlines()) if len(fields) > 1)
+        cls._ffmpeg_available = True
+    
     @classmethod
     def check_ffmpeg(cls) -> bool:
         """Check ffmpeg availability (cached)."""
         if cls._ffmpeg_available is None:
-            try:
-                subprocess.run(["ffmpeg", "-version"], capture_output=True, check=True)
-                cls._ffmpeg_available = True
-            except:
-                cls._ffmpeg_available = False
+            cls._probe_capabilities()
         return cls._ffmpeg_available
     
+    @classmethod
+    def available_encoders(cls) -> frozenset:
+        """Encoder names this ffmpeg was built with (cached)."""
+        if cls._encoders is None:
+            cls._probe_capabilities()
+        return cls._encoders
+    
+    @classmethod
+    def supports_quality_mode(cls, encoder: str) -> bool:
+        """Whether encoder accepts -q:v (cached; x86_64 VideoToolbox has no qscale mode)."""
+        if encoder not in cls._quality_mode:
+            import platform
+            
+            if platform.machine() != "arm64":
+                cls._quality_mode[encoder] = False
+            else:
+                # One-frame test encode: the only reliable answer is VideoToolbox's own
+                try:
+                    cls._quality_mode[encoder] = subprocess.run(
+                        ["ffmpeg", "-hide_banner", "-loglevel", "error",
+                         "-f", "lavfi", "-i", "color=size=64x64", "-frames:v", "1",
+                         "-c:v", encoder, "-q:v", "50", "-f", "null", "-"],
+                        capture_output=True, timeout=10
+                    ).returncode == 0
+                except Exception:
+                    cls._quality_mode[encoder] = False
+        return cls._quality_mode[encoder]
+    
+    def _resolve_codec(self) -> str:
+        if self.codec != "auto":
+            return self.codec
+        return "hevc" if self.ENCODERS["hevc"] in self.available_encoders() else "h264"
+    
     def start(self) -> bool:
-        """Start screen recording."""
+        """Start screen recording.
+        
+        An audio input that stops ffmpeg from starting is dropped from
+        audio_outputs and the screen restarted without it.
+        """
         if not self.check_ffmpeg():
             self._error = "ffmpeg not found. Install: brew install ffmpeg"
             logger.error(self._error)
             return False
         
         self.recording = True
+        codec = self._resolve_codec()
+        if self.bitrate:
+            rate = ["-b:v", self.bitrate]
+        elif self.quality or self.supports_quality_mode(self.ENCODERS[codec]):
+            rate = ["-q:v", str(self.quality or self.DEFAULT_QUALITY[codec])]
+        else:
+            rate = ["-b:v", self.DEFAULT_BITRATE[codec]]
         
+        while True:
+            try:
+                failed = self._spawn(codec, rate)
+            except Exception as e:
+                self._error = f"Failed to start screen recording: {e}"
+                failed = 0
+            if failed is None:
+                logger.info(f"Screen recording started: {self.output_path}")
+                return True
+            if failed == 0:
+                logger.error(self._error)
+                self.recording = False
+                return False
+            device, path = self.audio_outputs.pop(failed - 1)
+            logger.warning(f"{self._error}; recording without {path.name}")
+            self._error = None
+            try:
+                path.unlink()  # created empty by the failed attempt
+            except OSError:
+                pass
+    
+    def _spawn(self, codec: str, rate: list) -> Optional[int]:
+        """Launch ffmpeg; None once it is running.
+        
+        If it exits within START_CHECK, sets _error and returns the index of
+        the input it failed to open (0, the screen, when it doesn't say).
+        """
+        inputs = [f"{self.monitor_idx}:none", *(f":{device}" for device, _ in self.audio_outputs)]
         cmd = [
-            "ffmpeg",
-            "-y",
-            "-f", "avfoundation",
-            "-capture_cursor", "1",
+            *self._CMD_CAPTURE,
             "-framerate", str(self.fps),
-            "-i", f"{self.monitor_idx}:none",
-            "-c:v", "h264_videotoolbox",
-            "-b:v", "5M",
-            "-pix_fmt", "yuv420p",
-            str(self.output_path)
+            # nv12 is VideoToolbox's native input: captured frames go to the encoder
+            # with no swscale pass (avfoundation picks another format if unsupported)
+            "-pixel_format", "nv12",
+            "-thread_queue_size", str(self.fps),  # ~1s of raw frames if the disk stalls
+            "-i", inputs[0],
         ]
+        for spec in inputs[1:]:
+            cmd += ["-f", "avfoundation", "-thread_queue_size", "64", "-i", spec]
+        cmd += [
+            "-map", "0:v",
+            "-c:v", self.ENCODERS[codec],
+            *rate,
+            "-realtime", "1" if self.realtime else "0",
+            *self._CMD_ENCODE,
+        ]
+        if codec == "hevc":
+            cmd += ["-tag:v", "hvc1"]  # QuickTime only plays hvc1-tagged HEVC
         
-        try:
-            self.process = subprocess.Popen(
-                cmd,
-                stdin=subprocess.PIPE,
-                stdout=subprocess.DEVNULL,  # P0 fix: prevent buffer accumulation
-                stderr=subprocess.DEVNULL   # P0 fix: prevent buffer accumulation
-            )
-            logger.info(f"Screen recording started: {self.output_path}")
-            return True
-        except Exception as e:
-            self._error = f"Failed to start screen recording: {e}"
-            logger.error(self._error)
-            self.recording = False
-            return False
+        fds = []
+        # -loglevel error keeps this to a few lines; only read if ffmpeg dies at startup
+        with tempfile.TemporaryFile() as log:
+            try:
+                # We open the outputs so they can bypass the page cache (written once,
+                # read back later if ever). ffmpeg gets each fd as a pipe, so the MP4s
+                # are fragmented: no moov rewrite at EOF, playable even after a crash.
+                def output(path, *frag_args):
+                    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+                    fds.append(fd)
+                    try:
+                        fcntl.fcntl(fd, F_NOCACHE, 1)
+                    except OSError:
+                        pass  # not macOS
+                    return [*self._CMD_FRAGMENTED, *frag_args, f"pipe:{fd}"]
+                
+                cmd += output(self.output_path)
+                for i, (_, path) in enumerate(self.audio_outputs, start=1):
+                    cmd += ["-map", f"{i}:a", "-c:a", "aac", "-b:a", "128k",
+                            *output(path, *self._CMD_FRAG_AUDIO)]
+                # fork+exec, unlike the caffeinate/afplay helpers: pass_fds rules
+                # out CPython's posix_spawn path
+                self.process = subprocess.Popen(
+                    cmd,
+                    stdin=subprocess.PIPE,  # 'q' here stops ffmpeg even if it inherited blocked signals
+                    bufsize=0,
+                    stdout=subprocess.DEVNULL,  # P0 fix: prevent buffer accumulation
+                    stderr=log,
+                    pass_fds=fds,
+                )
+            finally:
+                for fd in fds:
+                    os.close(fd)  # ffmpeg holds its own copies
+            
+            try:
+                returncode = self.process.wait(timeout=self.START_CHECK)
+            except subprocess.TimeoutExpired:
+                return None
+            log.seek(0)
+            stderr = log.read().decode(errors="replace")
+        
+        self.process.stdin.close()
+        self.process = None
+        failed = self._failed_input(stderr, inputs)
+        name = "screen" if failed == 0 else f"audio device '{inputs[failed][1:]}'"
+        lines = stderr.strip().splitlines()
+        detail = lines[-1] if lines else f"exit code {returncode}"
+        self._error = f"ffmpeg could not open {name}: {detail}"
+        return failed
+    
+    @staticmethod
+    def _failed_input(stderr: str, inputs: list) -> int:
+        """Index of the input ffmpeg's error output names as failing; 0 if none."""
+        match = re.search(r"\bin#(\d+)", stderr)  # ffmpeg 6.1+: "[in#1 @ 0x...] Error opening input"
+        if match and int(match.group(1)) < len(inputs):
+            return int(match.group(1))
+        for i, spec in enumerate(inputs):
+            # Older ffmpeg: ":BlackHole 2ch: Input/output error"
+            if f"\n{spec}: " in f"\n{stderr}":
+                return i
+        return 0
     
     def stop(self):
         """Stop screen recording with robust process cleanup."""
@@ -240,11 +573,15 @@ class ScreenRecorder:
             return
         
         # P0 fix: robust multi-stage process termination
+        # 'q' on stdin rather than SIGINT: a signal is lost if the parent's
+        # mask blocked it when ffmpeg was spawned. Non-blocking, so a wedged
+        # ffmpeg with a full pipe can't hang stop(); the stages below take over.
         try:
-            self.process.stdin.write(b'q')
-            self.process.stdin.flush()
-        except (BrokenPipeError, OSError):
-            pass
+            stdin_fd = self.process.stdin.fileno()
+            os.set_blocking(stdin_fd, False)
+            os.write(stdin_fd, b'q')
+        except (OSError, ValueError):
+            pass  # already exited / pipe closed
         
         # Stage 1: graceful wait
         try:
@@ -267,20 +604,90 @@ class ScreenRecorder:
                     except:
                         pass
         
-        # Set secure file permissions
-        if self.output_path.exists():
-            os.chmod(self.output_path, 0o600)
+        # Popen only closes a pipe it owns on communicate(); don't leak the fd
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
         
+        # Outputs were created 0600 in start(); no chmod needed
         self.process = None
         logger.info("Screen recording stopped")
     
+    @property
+    def bytes_written(self) -> int:
+        """Current size of the output files (one stat each, no directory walk)."""
+        total = 0
+        for path in (self.output_path, *(path for _, path in self.audio_outputs)):
+            try:
+                total += os.stat(path).st_size
+            except OSError:
+                pass
+        return total
+    
     def get_error(self) -> Optional[str]:
         return self._error
 
 
+class _ByteRing:
+    """Single-producer/single-consumer byte ring buffer.
+    
+    Each side only advances its own counter, so the audio callback and the
+    writer thread never need a lock.
+    """
+    
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._view = memoryview(bytearray(capacity))
+        self._head = 0  # total bytes written (producer only)
+        self._tail = 0  # total bytes read (consumer only)
+    
+    def write(self, data) -> bool:
+        """Copy data in; returns False (dropping it) if there isn't room."""
+        n = len(data)
+        if n > self.capacity - (self._head - self._tail):
+            return False
+        start = self._head % self.capacity
+        first = min(n, self.capacity - start)
+        self._view[start:start + first] = data[:first]
+        self._view[:n - first] = data[first:]
+        self._head += n
+        return True
+    
+    def read(self) -> bytes:
+        """Take everything written so far."""
+        head = self._head
+        start = self._tail % self.capacity
+        end = start + head - self._tail
+        if end <= self.capacity:
+            out = self._view[start:end].tobytes()
+        else:
+            out = self._view[start:].tobytes() + self._view[:end - self.capacity].tobytes()
+        self._tail = head
+        return out
+
+
+@functools.lru_cache(maxsize=1)
+def _find_blackhole_device() -> Optional[int]:
+    """sounddevice index of the first BlackHole input (PortAudio enumeration, cached).
+    
+    Call _find_blackhole_device.cache_clear() after installing BlackHole mid-process.
+    """
+    import sounddevice as sd
+    
+    return next((i for i, d in enumerate(sd.query_devices())
+                 if "BlackHole" in d.get("name", "") and d.get("max_input_channels", 0) > 0), None)
+
+
 class AudioRecorder:
     """Records audio using sounddevice with streaming write (no memory leak)."""
     
+    RING_BYTES = 4 * 1024 * 1024  # ~23s of 44.1kHz stereo int16 between drains
+    BLOCKSIZE = 1024  # fixed callback size: same-shaped indata every block
+    DRAIN_INTERVAL = 1.0  # seconds between ring drains; stop() wakes the thread early
+    PREALLOCATE_SECONDS = 600  # disk reserved ahead of the writer, in audio time
+    STATUS_LOG_INTERVAL = 1.0  # xruns can fire every block; log at most this often
+    
     def __init__(self, output_path: Path, source: str = "microphone", sample_rate: int = 44100):
         self.output_path = output_path
         self.source = source
@@ -289,6 +696,10 @@ class AudioRecorder:
         self._recording_lock = threading.Lock()  # P0 fix: thread safety
         self.thread = None
         self._error = None
+        self._frames_written = 0
+        self._frames_dropped = 0
+        self._stop_event = threading.Event()
+        self._last_status_log = 0.0
     
     @property
     def recording(self) -> bool:
@@ -303,6 +714,9 @@ class AudioRecorder:
     def start(self) -> bool:
         """Start audio recording in a background thread."""
         self.recording = True
+        self._stop_event.clear()
+        self._frames_written = 0
+        self._frames_dropped = 0
         self.thread = threading.Thread(target=self._record_thread, daemon=True)
         self.thread.start()
         return True
@@ -319,12 +733,7 @@ class AudioRecorder:
                 device = sd.default.device[0]
             else:
                 # For system audio, need BlackHole
-                devices = sd.query_devices()
-                for i, d in enumerate(devices):
-                    if "BlackHole" in d.get("name", "") and d.get("max_input_channels", 0) > 0:
-                        device = i
-                        break
-                
+                device = _find_blackhole_device()
                 if device is None:
                     self._error = "BlackHole not found. Install: brew install blackhole-2ch"
                     logger.warning(self._error)
@@ -332,30 +741,54 @@ class AudioRecorder:
                     return
             
             # Streaming write - no memory accumulation!
+            # The realtime callback only copies int16 samples into the ring;
+            # this thread does all the file I/O.
+            ring = _ByteRing(self.RING_BYTES)
+            
+            def callback(indata, frames, time_info, status):
+                if status:
+                    now = time.monotonic()
+                    if now - self._last_status_log >= self.STATUS_LOG_INTERVAL:
+                        self._last_status_log = now
+                        logger.warning("Audio status: %s", status)
+                if not self._stop_event.is_set():  # lock-free, unlike self.recording
+                    if ring.write(memoryview(indata).cast("B")):
+                        self._frames_written += frames
+                    else:
+                        self._frames_dropped += frames
+            
+            # Open the fd ourselves (0600) so disk space can be reserved ahead of
+            # libsndfile's small appends, keeping the WAV contiguous on disk
+            fd = os.open(self.output_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            chunk_bytes = self.sample_rate * 4 * self.PREALLOCATE_SECONDS
+            reserved = chunk_bytes if preallocate(fd, chunk_bytes) else None
+            
             with sf.SoundFile(
-                str(self.output_path), mode='w',
+                fd, mode='w', format='WAV',
                 samplerate=self.sample_rate,
-                channels=2, subtype='PCM_16'
+                channels=2, subtype='PCM_16', closefd=True
             ) as f:
-                def callback(indata, frames, time_info, status):
-                    if status:
-                        logger.warning(f"Audio status: {status}")
-                    if self.recording:
-                        f.write(indata)  # Write directly to file
-                
                 with sd.InputStream(
                     device=device,
                     samplerate=self.sample_rate,
                     channels=2,
+                    dtype='int16',  # PortAudio converts; no float->int work in Python
+                    dither_off=True,  # plain scaled conversion, no per-sample noise generation
+                    blocksize=self.BLOCKSIZE,
                     callback=callback
                 ):
                     logger.info(f"Audio recording started ({self.source}): {self.output_path}")
-                    while self.recording:
-                        time.sleep(0.1)
+                    while not self._stop_event.wait(self.DRAIN_INTERVAL):
+                        if chunk := ring.read():
+                            f.buffer_write(chunk, dtype='int16')
+                        if reserved is not None and self.bytes_written > reserved - chunk_bytes // 2:
+                            preallocate(fd, chunk_bytes)
+                            reserved += chunk_bytes
+                if chunk := ring.read():  # whatever arrived before the stream closed
+                    f.buffer_write(chunk, dtype='int16')
             
-            # Set secure file permissions
-            if self.output_path.exists():
-                os.chmod(self.output_path, 0o600)
+            if self._frames_dropped:
+                logger.warning(f"Audio ring overrun, dropped {self._frames_dropped} frames ({self.source})")
             
             logger.info(f"Audio recording stopped ({self.source})")
         
@@ -369,10 +802,16 @@ class AudioRecorder:
     def stop(self):
         """Stop audio recording."""
         self.recording = False
+        self._stop_event.set()
         if self.thread:
             self.thread.join(timeout=5)
             self.thread = None
     
+    @property
+    def bytes_written(self) -> int:
+        """Approximate PCM bytes written so far (2 channels x 16-bit)."""
+        return self._frames_written * 4
+    
     def get_error(self) -> Optional[str]:
         return self._error
 
@@ -383,34 +822,38 @@ class BluetoothAnonymizer:
     MAX_DEVICES = 5000  # P1 fix (Memory): LRU cache limit
     
     def __init__(self, salt: str = None):
-        from collections import OrderedDict
         self.salt = salt or os.urandom(16).hex()
-        self.device_map = OrderedDict()
+        key = self.salt.encode()
+        if len(key) > hashlib.blake2s.MAX_KEY_SIZE:
+            key = hashlib.blake2s(key).digest()
+        # Keyed BLAKE2s, 3-byte digest = 6 hex chars; copied per new device
+        self._salted = hashlib.blake2s(key=key, digest_size=3)
+        # Per-instance C-level LRU (a decorated method would share one cache
+        # across instances and keep them alive)
+        self._lookup = functools.lru_cache(maxsize=self.MAX_DEVICES)(self._hash)
+    
+    def _hash(self, device_name: str) -> str:
+        h = self._salted.copy()
+        h.update(device_name.encode())
+        return f"Device_{h.hexdigest()}"
     
     def anonymize(self, device_name: str) -> str:
         """Anonymize device name with consistent hash (LRU cached)."""
         if not device_name:
             return "Unknown"
-        
-        if device_name in self.device_map:
-            self.device_map.move_to_end(device_name)  # LRU update
-            return self.device_map[device_name]
-        
-        # P1 fix: LRU eviction when cache is full
-        while len(self.device_map) >= self.MAX_DEVICES:
-            self.device_map.popitem(last=False)
-        
-        hash_value = hashlib.sha256(
-            (self.salt + device_name).encode()
-        ).hexdigest()[:6]
-        self.device_map[device_name] = f"Device_{hash_value}"
-        
-        return self.device_map[device_name]
+        return self._lookup(device_name)
+    
+    def reset(self):
+        """Forget cached names (the salt, and so the mapping, is unchanged)."""
+        self._lookup.cache_clear()
 
 
 class BluetoothMonitor:
     """Monitors Bluetooth device RSSI with anonymization."""
     
+    RSSI_DELTA = 3  # dB change worth reporting once scan_interval has passed
+    HEARTBEAT = 5.0  # seconds after which a device is reported even if unchanged
+    
     def __init__(self, callback: Callable[[str, int], None], scan_interval: float = 1.0, anonymize: bool = True):
         self.callback = callback
         self.scan_interval = scan_interval
@@ -420,6 +863,10 @@ class BluetoothMonitor:
         self._running_lock = threading.Lock()
         self.thread = None
         self.loop = None
+        self._wake = None  # asyncio.Event the scan task sleeps on until stop()
+        self._last_emit = {}  # address -> (monotonic time, rssi) of last reported reading
+        self._last_prune = 0.0
+        self._last_error_log = 0.0
         self._anonymizer = BluetoothAnonymizer() if anonymize else None
         self._error = None
     
@@ -436,42 +883,78 @@ class BluetoothMonitor:
     def start(self) -> bool:
         """Start Bluetooth monitoring in a background thread."""
         self.running = True
+        self._last_emit = {}
+        self._last_prune = time.monotonic()
         self.thread = threading.Thread(target=self._monitor_thread, daemon=True)
         self.thread.start()
         return True
     
+    def _on_adv(self, device, adv_data):
+        """Detection callback, run directly on each advertisement dispatch."""
+        # P1 fix (Concurrency): wrap callback in try/except
+        try:
+            rssi = adv_data.rssi
+            if rssi is None:
+                return
+            # Report at most once per scan_interval, and then only if RSSI
+            # moved by RSSI_DELTA or the device has been quiet for HEARTBEAT
+            now = time.monotonic()
+            if now - self._last_prune >= self.HEARTBEAT:
+                # CoreBluetooth rotates random addresses; entries past HEARTBEAT
+                # would be reported anyway, so dropping them changes nothing
+                cutoff = now - self.HEARTBEAT
+                self._last_emit = {a: v for a, v in self._last_emit.items() if v[0] > cutoff}
+                self._last_prune = now
+            last = self._last_emit.get(device.address)
+            if last is not None:
+                elapsed = now - last[0]
+                if elapsed < self.HEARTBEAT and (
+                    elapsed < self.scan_interval or abs(rssi - last[1]) < self.RSSI_DELTA
+                ):
+                    return
+            self._last_emit[device.address] = (now, rssi)
+            
+            name = device.name or adv_data.local_name or "Unknown"
+            
+            # Anonymize device name if enabled
+            if self._anonymizer:
+                name = self._anonymizer.anonymize(name)
+            
+            self.callback(name, rssi)
+        except Exception as e:
+            # Same failure would repeat per advert; log at most once a second
+            now = time.monotonic()
+            if now - self._last_error_log >= 1.0:
+                self._last_error_log = now
+                logger.error("Bluetooth callback error: %s", e)
+    
     def _monitor_thread(self):
         """Background thread for Bluetooth monitoring."""
         try:
             from bleak import BleakScanner
             
             async def scan():
-                while self.running:
-                    try:
-                        devices = await BleakScanner.discover(timeout=self.scan_interval)
-                        for device in devices:
-                            # P1 fix (Concurrency): wrap callback in try/except
-                            try:
-                                name = device.name or "Unknown"
-                                rssi = device.rssi
-                                
-                                # Anonymize device name if enabled
-                                if self._anonymizer:
-                                    name = self._anonymizer.anonymize(name)
-                                
-                                if rssi is not None:
-                                    self.callback(name, rssi)
-                            except Exception as e:
-                                logger.error(f"Bluetooth callback error: {e}")
-                    except Exception as e:
-                        logger.warning(f"Bluetooth scan error: {e}")
-                    
-                    await asyncio.sleep(self.scan_interval)
+                # One long-lived scanner pushes adverts as they arrive, instead
+                # of restarting CoreBluetooth with discover() every interval
+                scanner = BleakScanner(detection_callback=self._on_adv)
+                self._wake = asyncio.Event()
+                await scanner.start()
+                try:
+                    if self.running:  # stop() may have run before _wake existed
+                        await self._wake.wait()
+                finally:
+                    await scanner.stop()
             
-            self.loop = asyncio.new_event_loop()
+            # Per-thread loop; no global policy change for the rest of the app
+            self.loop = uvloop.new_event_loop() if uvloop else asyncio.new_event_loop()
             asyncio.set_event_loop(self.loop)
+            lower_thread_qos()  # adverts have no latency requirement
             logger.info("Bluetooth monitoring started")
-            self.loop.run_until_complete(scan())
+            try:
+                self.loop.run_until_complete(scan())
+            finally:
+                # Finalize bleak's async generators here, so stop() can close the loop cleanly
+                self.loop.run_until_complete(self.loop.shutdown_asyncgens())
         
         except ImportError as e:
             self._error = f"Missing dependency: {e}. Run: pip install bleak"
@@ -483,21 +966,30 @@ class BluetoothMonitor:
     def stop(self):
         """Stop Bluetooth monitoring with proper resource cleanup."""
         self.running = False
-        
-        # P0 fix (Concurrency): capture local reference to avoid race condition
-        loop_ref = self.loop
-        if loop_ref:
+        loop_ref, wake = self.loop, self._wake
+        if loop_ref and wake:
             try:
-                loop_ref.call_soon_threadsafe(loop_ref.stop)
+                loop_ref.call_soon_threadsafe(wake.set)
             except RuntimeError:
                 pass  # Already closed
         
         if self.thread:
+            # The woken scan task stops the scanner itself
             self.thread.join(timeout=5)
+            loop_ref = self.loop
+            if self.thread.is_alive() and loop_ref:
+                try:
+                    loop_ref.call_soon_threadsafe(loop_ref.stop)
+                except RuntimeError:
+                    pass  # Already closed
+                self.thread.join(timeout=1)
             if self.thread.is_alive():
                 logger.warning("Bluetooth thread did not terminate in time")
             self.thread = None
         
+        # P0 fix (Concurrency): capture local reference to avoid race condition
+        loop_ref = self.loop
+        
         # P0 fix: properly close asyncio event loop to prevent resource leak
         if loop_ref:
             try:
@@ -505,12 +997,26 @@ class BluetoothMonitor:
             except Exception:
                 pass
         self.loop = None
+        self._wake = None
+        if self._anonymizer:
+            self._anonymizer.reset()
         logger.info("Bluetooth monitoring stopped")
     
     def get_error(self) -> Optional[str]:
         return self._error
 
 
+@functools.lru_cache(maxsize=4)
+def _read_yaml(path: str, mtime_ns: int, size: int) -> dict:
+    """Parse a YAML file; the stat fields key the cache so edits are picked up."""
+    import yaml  # deferred: only needed when a config file exists
+    
+    with open(path) as f:
+        # LibYAML-backed loader when available
+        loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+        return yaml.load(f, Loader=loader) or {}
+
+
 def load_config(config_path: Path = None) -> dict:
     """Load configuration from YAML file."""
     default_config = {
@@ -518,6 +1024,8 @@ def load_config(config_path: Path = None) -> dict:
             "fps": 30,
             "quality": "high",
             "include_cursor": True,
+            "codec": "auto",
+            "bitrate": None,  # e.g. "5M"; None = quality mode where supported
         },
         "audio": {
             "system_audio": True,
@@ -544,18 +1052,20 @@ def load_config(config_path: Path = None) -> dict:
     
     if config_path.exists():
         try:
-            with open(config_path) as f:
-                user_config = yaml.safe_load(f) or {}
+            st = config_path.stat()
+            # Copy: the merge below links user values into the returned dict
+            user_config = copy.deepcopy(_read_yaml(str(config_path), st.st_mtime_ns, st.st_size))
             
             # Deep merge
-            def merge(base, override):
+            pending = [(default_config, user_config)]
+            while pending:
+                base, override = pending.pop()
                 for key, value in override.items():
                     if key in base and isinstance(base[key], dict) and isinstance(value, dict):
-                        merge(base[key], value)
+                        pending.append((base[key], value))
                     else:
                         base[key] = value
-            
-            merge(default_config, user_config)
+
             logger.info(f"Config loaded from {config_path}")
         except Exception as e:
             logger.warning(f"Failed to load config: {e}, using defaults")
@@ -570,15 +1080,108 @@ def secure_directory(path: Path):
 
 def secure_file(path: Path):
     """Set secure permissions on file (600)."""
-    if path.exists():
-        os.chmod(path, 0o600)
+    try:
+        os.chmod(path, 0o600)  # one syscall; no exists() pre-check
+    except FileNotFoundError:
+        pass
+
+
+def fsync_directory(path: Path):
+    """Flush directory entries (creates/renames) in path to disk."""
+    dfd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(dfd)
+    finally:
+        os.close(dfd)
+
 
+def _write_all(fd: int, payload: bytes):
+    """os.write until all of payload is written (os.write may write less)."""
+    view = memoryview(payload)
+    while view:
+        view = view[os.write(fd, view):]
 
-def play_sound(sound_name: str = "Blow"):
-    """Play macOS system sound."""
+
+def atomic_write(path: Path, payload: bytes, mode: Optional[int] = None):
+    """Durably replace path: write temp (O_DSYNC) -> rename -> fsync(dir).
+    
+    mode defaults to path's current permissions, or 0600 for a new file.
+    """
+    if mode is None:
+        try:
+            mode = os.stat(path).st_mode & 0o777
+        except FileNotFoundError:
+            mode = 0o600
+    temp_path = path.with_suffix(path.suffix + ".tmp")
+    fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_DSYNC, mode)
+    try:
+        os.fchmod(fd, mode)  # a leftover temp file keeps its old mode through O_CREAT
+        _write_all(fd, payload)
+    finally:
+        os.close(fd)
+    os.replace(temp_path, path)  # Atomic on POSIX
+    fsync_directory(path.parent)
+
+
+def write_new_file(path: Path, payload: bytes):
+    """Create a new 0600 file (no temp + rename: there is nothing to replace).
+    
+    Durability comes from one fsync of the containing directory, not a per-file sync.
+    """
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    try:
+        _write_all(fd, payload)
+    finally:
+        os.close(fd)
+
+
+def make_session_dir(parent: Path, name: str) -> Path:
+    """Create a new 0700 session directory, suffixing _2, _3... if name is taken.
+    
+    Names have one-second resolution, so a quick stop/start must not reuse a directory.
+    """
+    path, n = parent / name, 1
+    while True:
+        try:
+            path.mkdir(mode=0o700)
+            return path
+        except FileExistsError:
+            n += 1
+            path = parent / f"{name}_{n}"
+
+
+@functools.lru_cache(maxsize=None)
+def _sound_command(sound_name: str) -> Optional[tuple]:
+    """afplay argv for a system sound, or None if either is missing (looked up once)."""
     sound_path = f"/System/Library/Sounds/{sound_name}.aiff"
-    if Path(sound_path).exists():
-        subprocess.run(["afplay", sound_path], capture_output=True)
+    afplay = shutil.which("afplay")
+    if afplay and Path(sound_path).exists():
+        return (afplay, sound_path)
+    return None
+
+
+@functools.lru_cache(maxsize=8)
+def _system_sound(sound_name: str):
+    """Cached NSSound for a system sound, or None without PyObjC."""
+    try:
+        from AppKit import NSSound
+    except ImportError:
+        return None
+    return NSSound.soundNamed_(sound_name)
+
+
+def play_sound(sound_name: str = "Blow", wait: bool = False):
+    """Play macOS system sound (non-blocking unless wait, e.g. right before exit)."""
+    sound = _system_sound(sound_name)
+    if sound is not None:
+        sound.stop()  # rewind if the previous play is still going
+        sound.play()
+        if wait:
+            time.sleep(sound.duration())
+        return
+    cmd = _sound_command(sound_name)
+    if cmd:
+        subprocess.run(cmd, capture_output=True, close_fds=False)  # posix_spawn path
 
 
 def cli():
@@ -594,7 +1197,10 @@ def cli():
     @click.option("--no-bluetooth", is_flag=True, help="Disable Bluetooth monitoring")
     @click.option("--output-dir", default="~/Recordings", help="Output directory")
     @click.option("--no-anonymize", is_flag=True, help="Disable Bluetooth anonymization")
-    def main(output_name, fps, no_screen, no_audio, no_mic, no_bluetooth, output_dir, no_anonymize):
+    @click.option("--bitrate", default=None,
+                  help="Video bitrate, e.g. 5M (default: recording.bitrate, else quality mode where supported)")
+    def main(output_name, fps, no_screen, no_audio, no_mic, no_bluetooth, output_dir, no_anonymize,
+             bitrate):
         """Record screen, audio, microphone, and Bluetooth RSSI.
         
         Press Ctrl+C to stop recording.
@@ -612,22 +1218,52 @@ def cli():
         output_dir.mkdir(exist_ok=True)
         secure_directory(output_dir)
         
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        session_dir = output_dir / f"{output_name}_{timestamp}"
-        session_dir.mkdir(exist_ok=True)
-        secure_directory(session_dir)
+        timestamp = time.strftime("%Y%m%d_%H%M%S")
+        session_dir = make_session_dir(output_dir, f"{output_name}_{timestamp}")
         
         print(f"📁 Recording to: {session_dir}")
         print("Press Ctrl+C to stop...")
         
         components = []
-        event_file = open(session_dir / "events.jsonl", "w")
-        secure_file(session_dir / "events.jsonl")
+        event_fd = os.open(session_dir / "events.jsonl", os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        event_queue = queue.SimpleQueue()
         
         def log_event(event_type: str, data: dict):
-            event = {"ts": time.time_ns(), "type": event_type, **data}
-            event_file.write(json.dumps(event) + "\n")
-            event_file.flush()
+            # Callers pass fresh dicts, so stamp in place instead of copying
+            data["ts"] = time.time_ns()
+            data["type"] = event_type
+            event_queue.put(dump_json(data) + b"\n")
+        
+        def write_events():
+            # Gather up to 64 lines or 100ms into one writev(2); None stops.
+            # fsync at most once a second so a crash loses little without
+            # paying a disk flush per batch.
+            last_sync = time.monotonic()
+            while True:
+                bufs = [event_queue.get()]
+                deadline = time.monotonic() + 0.1
+                while len(bufs) < 64 and bufs[-1] is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        bufs.append(event_queue.get(timeout=remaining))
+                    except queue.Empty:
+                        break
+                done = bufs[-1] is None
+                if done:
+                    bufs.pop()
+                if bufs:
+                    os.writev(event_fd, bufs)
+                    if time.monotonic() - last_sync >= 1.0:
+                        os.fsync(event_fd)
+                        last_sync = time.monotonic()
+                if done:
+                    os.fsync(event_fd)
+                    return
+        
+        event_writer = threading.Thread(target=write_events, daemon=True)
+        event_writer.start()
         
         # Prevent sleep
         sleep_inhibitor = SleepInhibitor()
@@ -637,24 +1273,41 @@ def cli():
         play_sound("Blow")
         
         try:
-            # Start screen recording
+            # Start screen recording; audio rides in the same ffmpeg (one clock, AAC)
+            in_screen = set()
             if not no_screen:
-                screen = ScreenRecorder(session_dir / "screen.mp4", fps=fps)
+                audio_outputs = []
+                if not no_mic:
+                    audio_outputs.append(("default", session_dir / "mic.m4a"))
+                if not no_audio:
+                    blackhole = next((d for d in ScreenRecorder.list_audio_devices() if "BlackHole" in d), None)
+                    if blackhole:
+                        audio_outputs.append((blackhole, session_dir / "audio.m4a"))
+                    else:
+                        print("✗ System audio skipped: BlackHole not found (brew install blackhole-2ch)")
+                        no_audio = True  # reported; the sounddevice fallback would only fail too
+                if bitrate is None:
+                    bitrate = load_config()["recording"]["bitrate"]
+                screen = ScreenRecorder(session_dir / "screen.mp4", fps=fps, bitrate=bitrate,
+                                        audio_outputs=audio_outputs)
                 if screen.start():
                     components.append(("screen", screen))
                     print("✓ Screen recording started")
+                    for _, path in screen.audio_outputs:  # less any that failed to open
+                        in_screen.add(path.name)
+                        print(f"✓ Audio recording started ({path.name})")
                 else:
                     print(f"✗ Screen recording failed: {screen.get_error()}")
             
-            # Start audio recording
-            if not no_audio:
+            # Whatever the screen ffmpeg isn't recording (disabled, failed to
+            # start, or device failed to open) falls back to sounddevice
+            if "audio.m4a" not in in_screen and not no_audio:
                 audio = AudioRecorder(session_dir / "audio.wav", source="system")
                 if audio.start():
                     components.append(("audio", audio))
                     print("✓ System audio recording started")
             
-            # Start microphone recording
-            if not no_mic:
+            if "mic.m4a" not in in_screen and not no_mic:
                 mic = AudioRecorder(session_dir / "mic.wav", source="microphone")
                 if mic.start():
                     components.append(("mic", mic))
@@ -662,8 +1315,12 @@ def cli():
             
             # Start Bluetooth monitoring
             if not no_bluetooth:
+                # Same bytes log_event would produce, minus the per-event dict;
+                # only the name needs JSON escaping
+                bt_line = b'{"device":%s,"rssi":%d,"ts":%d,"type":"bluetooth"}\n'
+                
                 def bt_callback(name, rssi):
-                    log_event("bluetooth", {"device": name, "rssi": rssi})
+                    event_queue.put(bt_line % (dump_json(name), rssi, time.time_ns()))
                 
                 bt = BluetoothMonitor(
                     callback=bt_callback,
@@ -677,18 +1334,42 @@ def cli():
             log_event("recording", {"action": "start"})
             print("\n🔴 Recording...")
             
-            # Wait for Ctrl+C
-            start_time = time.time()
-            while True:
-                elapsed = int(time.time() - start_time)
-                mins, secs = divmod(elapsed, 60)
-                hours, mins = divmod(mins, 60)
-                if hours > 0:
-                    time_str = f"{hours:02d}:{mins:02d}:{secs:02d}"
-                else:
-                    time_str = f"{mins:02d}:{secs:02d}"
-                print(f"\r  Duration: {time_str}", end="", flush=True)
-                time.sleep(1)
+            # Wait for Ctrl+C (or SIGTERM): signals land on a wakeup fd, so the
+            # loop sleeps until the next tick or a signal, whichever comes first.
+            # Ticks follow a monotonic deadline so seconds never repeat or skip.
+            sys.stdout.flush()  # os.write below bypasses the text buffer
+            wake_r, wake_w = os.pipe()
+            os.set_blocking(wake_r, False)
+            os.set_blocking(wake_w, False)
+            old_wakeup_fd = signal.set_wakeup_fd(wake_w)
+            old_handlers = {sig: signal.signal(sig, lambda *_: None)
+                            for sig in (signal.SIGINT, signal.SIGTERM)}
+            try:
+                with selectors.DefaultSelector() as sel:
+                    sel.register(wake_r, selectors.EVENT_READ)
+                    start = time.monotonic()
+                    tick = 0
+                    live = os.isatty(1)  # piped/logged output gets no per-second redraw
+                    while True:
+                        timeout = None  # not live: sleep until a signal
+                        if live:
+                            mins, secs = divmod(tick, 60)
+                            hours, mins = divmod(mins, 60)
+                            if hours > 0:
+                                os.write(1, b"\r  Duration: %02d:%02d:%02d" % (hours, mins, secs))
+                            else:
+                                os.write(1, b"\r  Duration: %02d:%02d" % (mins, secs))
+                            tick += 1
+                            timeout = max(0.0, start + tick - time.monotonic())
+                        if sel.select(timeout=timeout):
+                            break  # a signal byte arrived
+            finally:
+                for sig, handler in old_handlers.items():
+                    signal.signal(sig, handler)
+                signal.set_wakeup_fd(old_wakeup_fd)
+                os.close(wake_r)
+                os.close(wake_w)
+            print("\n\n⏹️  Stopping...")
         
         except KeyboardInterrupt:
             print("\n\n⏹️  Stopping...")
@@ -696,17 +1377,25 @@ def cli():
         finally:
             log_event("recording", {"action": "stop"})
             
-            # Stop all components
-            for name, component in components:
+            # Stop all components at once: ffmpeg can take seconds to finalize,
+            # and the other recorders shouldn't wait behind it
+            for name, _ in components:
                 print(f"  Stopping {name}...")
-                component.stop()
+            if components:
+                with ThreadPoolExecutor(max_workers=len(components)) as ex:
+                    list(ex.map(lambda nc: nc[1].stop(), components))
             
             sleep_inhibitor.stop()
-            event_file.close()
-            secure_file(session_dir / "events.jsonl")
+            event_queue.put(None)
+            event_writer.join(timeout=5)
+            if event_writer.is_alive():
+                # Still in writev/fsync: closing now could let it write into a reused fd
+                logger.warning("Event writer did not finish; leaving events.jsonl open")
+            else:
+                os.close(event_fd)  # created 0600 by os.open
             
-            # Play stop sound
-            play_sound("Glass")
+            # Play stop sound (wait, or exiting would cut it off)
+            play_sound("Glass", wait=True)
             
             print(f"\n✓ Recording saved to: {session_dir}")
     
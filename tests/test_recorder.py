@@ -5,20 +5,28 @@ Run with: pytest tests/ -v
 """
 
 import pytest
+import subprocess
 import tempfile
 import json
 from pathlib import Path
+from types import SimpleNamespace
 from unittest.mock import Mock, patch
 import sys
+import os
 
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from recorder import (
     BluetoothAnonymizer,
+    atomic_write,
+    dump_json,
     load_config,
+    load_json,
+    make_session_dir,
     secure_directory,
     secure_file,
+    write_new_file,
 )
 
 
@@ -51,6 +59,14 @@ class TestBluetoothAnonymizer:
         result = anon.anonymize("MyDevice")
         assert result.startswith("Device_")
         assert len(result) == 13  # "Device_" + 6 hex chars
+    
+    def test_reset_keeps_mapping(self):
+        """reset() drops the cache but the same salt still gives the same IDs."""
+        anon = BluetoothAnonymizer(salt="test-salt")
+        before = anon.anonymize("AirPods Pro")
+        anon.reset()
+        assert anon._lookup.cache_info().currsize == 0
+        assert anon.anonymize("AirPods Pro") == before
 
 
 class TestLoadConfig:
@@ -107,6 +123,203 @@ class TestSecurePermissions:
             path.unlink()
 
 
+class TestAtomicWrite:
+    """Tests for durable atomic file replacement."""
+    
+    def test_replaces_content(self):
+        """Should replace existing content and leave no temp file behind."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "state.json"
+            path.write_text("old")
+            atomic_write(path, b"new")
+            assert path.read_bytes() == b"new"
+            assert list(Path(tmpdir).iterdir()) == [path]
+    
+    def test_permissions(self):
+        """New file should be created with 600 permissions."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "state.json"
+            atomic_write(path, b"{}")
+            assert path.stat().st_mode & 0o777 == 0o600
+    
+    def test_keeps_existing_mode(self):
+        """Replacing a file should keep its permissions (e.g. a user's 0644 config)."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "config.yaml"
+            path.write_text("old")
+            path.chmod(0o644)
+            atomic_write(path, b"new")
+            assert path.stat().st_mode & 0o777 == 0o644
+    
+    def test_short_writes(self, tmp_path):
+        """A short os.write must not leave a truncated file in place."""
+        real_write = os.write
+        path = tmp_path / "state.json"
+        with patch("os.write", side_effect=lambda fd, data: real_write(fd, bytes(data[:3]))):
+            atomic_write(path, b"0123456789")
+        assert path.read_bytes() == b"0123456789"
+
+
+class TestSessionFiles:
+    """Tests for session directory and marker file creation."""
+    
+    def test_same_second_restart(self, tmp_path):
+        """A second session in the same second gets its own directory and files."""
+        first = make_session_dir(tmp_path, "recording_20260101_120000")
+        write_new_file(first / "reference_time.json", b"1")
+        second = make_session_dir(tmp_path, "recording_20260101_120000")
+        write_new_file(second / "reference_time.json", b"2")
+        
+        assert second == tmp_path / "recording_20260101_120000_2"
+        assert second.stat().st_mode & 0o777 == 0o700
+        assert (first / "reference_time.json").read_bytes() == b"1"
+        assert (second / "reference_time.json").read_bytes() == b"2"
+    
+    def test_short_writes(self, tmp_path):
+        """The whole payload lands even if os.write writes a few bytes at a time."""
+        real_write = os.write
+        path = tmp_path / "COMPLETE"
+        with patch("os.write", side_effect=lambda fd, data: real_write(fd, bytes(data[:3]))):
+            write_new_file(path, b"0123456789")
+        assert path.read_bytes() == b"0123456789"
+        assert path.stat().st_mode & 0o777 == 0o600
+
+
+class TestDumpJson:
+    """Tests for JSON event serialization."""
+    
+    def test_returns_compact_bytes(self):
+        """Should return compact UTF-8 bytes that round-trip."""
+        event = {"ts": 1, "type": "bluetooth", "device": "기기", "rssi": -45}
+        result = dump_json(event)
+        assert isinstance(result, bytes)
+        assert b"\n" not in result
+        assert json.loads(result) == event
+    
+    def test_indent(self):
+        """Indented output should span multiple lines."""
+        result = dump_json({"a": 1, "b": 2}, indent=True)
+        assert b"\n" in result
+        assert json.loads(result) == {"a": 1, "b": 2}
+    
+    def test_load_json_round_trip(self):
+        """load_json should parse dump_json output."""
+        event = {"ts": 1708588800000000000, "granted": True, "version": "1.0"}
+        assert load_json(dump_json(event)) == event
+
+
+class FakeBleakScanner:
+    """Minimal stand-in for bleak.BleakScanner that replays adverts on start."""
+    
+    adverts = []
+    
+    def __init__(self, detection_callback):
+        self.detection_callback = detection_callback
+        self.stopped = False
+    
+    async def start(self):
+        for device, adv in self.adverts:
+            self.detection_callback(device, adv)
+    
+    async def stop(self):
+        self.stopped = True
+
+
+def _advert(address, name, rssi):
+    return (
+        SimpleNamespace(address=address, name=name),
+        SimpleNamespace(rssi=rssi, local_name=None),
+    )
+
+
+class TestBluetoothMonitor:
+    """Tests for BluetoothMonitor with a fake bleak scanner."""
+    
+    def _run(self, adverts, **kwargs):
+        from recorder import BluetoothMonitor
+        
+        FakeBleakScanner.adverts = adverts
+        readings = []
+        fake_bleak = Mock(BleakScanner=FakeBleakScanner)
+        with patch.dict(sys.modules, {"bleak": fake_bleak}):
+            monitor = BluetoothMonitor(
+                callback=lambda name, rssi: readings.append((name, rssi)), **kwargs
+            )
+            monitor.start()
+            monitor.stop()
+        assert monitor.get_error() is None
+        return readings
+    
+    def test_reports_adverts(self):
+        """Adverts from the detection callback should reach the callback."""
+        readings = self._run(
+            [_advert("AA", "AirPods", -40), _advert("BB", "iPhone", -60)],
+            anonymize=False,
+        )
+        assert readings == [("AirPods", -40), ("iPhone", -60)]
+    
+    def test_anonymizes_names(self):
+        """Device names should be anonymized by default."""
+        readings = self._run([_advert("AA", "AirPods", -40)])
+        assert readings[0][0].startswith("Device_")
+    
+    def test_throttles_per_device(self):
+        """Repeated adverts within scan_interval should be reported once."""
+        readings = self._run(
+            [_advert("AA", "AirPods", -40), _advert("AA", "AirPods", -41)],
+            anonymize=False,
+        )
+        assert readings == [("AirPods", -40)]
+    
+    def test_reports_rssi_changes_only(self):
+        """Past scan_interval, only RSSI moves of RSSI_DELTA or more are reported."""
+        readings = self._run(
+            [_advert("AA", "AirPods", -40), _advert("AA", "AirPods", -41), _advert("AA", "AirPods", -50)],
+            anonymize=False, scan_interval=0.0,
+        )
+        assert readings == [("AirPods", -40), ("AirPods", -50)]
+    
+    def test_prunes_rotating_addresses(self):
+        """Per-address state stays bounded when addresses keep rotating."""
+        from recorder import BluetoothMonitor
+        
+        readings = []
+        monitor = BluetoothMonitor(callback=lambda name, rssi: readings.append(name), anonymize=False)
+        clock = [1000.0]
+        with patch("recorder.time.monotonic", side_effect=lambda: clock[0]):
+            for i in range(600):  # a fresh address every 0.1s for a minute
+                clock[0] += 0.1
+                monitor._on_adv(*_advert(f"addr-{i}", "Phone", -50))
+        assert len(readings) == 600
+        # Only about HEARTBEAT worth of addresses (plus one sweep period) survives
+        assert len(monitor._last_emit) <= 2 * BluetoothMonitor.HEARTBEAT / 0.1 + 1
+
+
+class TestByteRing:
+    """Tests for the audio ring buffer."""
+    
+    def test_wraps_around(self):
+        from recorder import _ByteRing
+        ring = _ByteRing(8)
+        assert ring.write(b"abcdef")
+        assert ring.read() == b"abcdef"
+        assert ring.write(b"ghijk")  # crosses the end of the buffer
+        assert ring.read() == b"ghijk"
+        assert ring.read() == b""
+    
+    def test_drops_when_full(self):
+        from recorder import _ByteRing
+        ring = _ByteRing(8)
+        assert ring.write(b"abcde")
+        assert not ring.write(b"fghi")
+        assert ring.read() == b"abcde"
+
+
+def _running_ffmpeg():
+    """Mock ffmpeg process that is still running after ScreenRecorder.START_CHECK."""
+    return Mock(**{"wait.side_effect": subprocess.TimeoutExpired("ffmpeg", 0)})
+
+
 class TestScreenRecorder:
     """Tests for ScreenRecorder (mocked)."""
     
@@ -116,19 +329,193 @@ class TestScreenRecorder:
         
         # Reset cache
         ScreenRecorder._ffmpeg_available = None
+        ScreenRecorder._encoders = None
         
         with patch('subprocess.run') as mock_run:
-            mock_run.return_value = Mock(returncode=0)
+            mock_run.return_value = Mock(returncode=0, stdout=(
+                "Encoders:\n V..... = Video\n ------\n"
+                " V....D hevc_videotoolbox    VideoToolbox H.265 Encoder (codec hevc)\n"
+            ))
             
             # First call
             result1 = ScreenRecorder.check_ffmpeg()
             # Second call (should use cache)
             result2 = ScreenRecorder.check_ffmpeg()
+            # The same probe also answered which encoders exist
+            encoders = ScreenRecorder.available_encoders()
             
             # subprocess.run should only be called once
             assert mock_run.call_count == 1
             assert result1 == result2
+            assert encoders == {"hevc_videotoolbox"}
+    
+    def test_encoder_args(self, tmp_path):
+        """Quality mode by default; HEVC adds the hvc1 tag."""
+        from recorder import ScreenRecorder
+        
+        ScreenRecorder._ffmpeg_available = True
+        with patch('subprocess.Popen', return_value=_running_ffmpeg()) as mock_popen, \
+             patch.object(ScreenRecorder, "supports_quality_mode", return_value=True):
+            assert ScreenRecorder(tmp_path / "a.mp4", codec="h264").start()
+            assert ScreenRecorder(tmp_path / "b.mp4", codec="hevc", bitrate="5M").start()
+        
+        h264, hevc = (c.args[0] for c in mock_popen.call_args_list)
+        assert h264[h264.index("-c:v") + 1] == "h264_videotoolbox"
+        assert h264[h264.index("-q:v") + 1] == "65"
+        assert hevc[hevc.index("-c:v") + 1] == "hevc_videotoolbox"
+        assert hevc[hevc.index("-b:v") + 1] == "5M"
+        assert hevc[hevc.index("-tag:v") + 1] == "hvc1"
+        # Output goes to a pre-opened fd as fragmented MP4
+        assert h264[-1].startswith("pipe:")
+        assert (tmp_path / "a.mp4").exists()
+    
+    def test_bitrate_without_quality_mode(self, tmp_path):
+        """Intel Macs (no VideoToolbox -q:v) default to bitrate mode without probing."""
+        from recorder import ScreenRecorder
+        
+        ScreenRecorder._ffmpeg_available = True
+        with patch('subprocess.Popen', return_value=_running_ffmpeg()) as mock_popen, \
+             patch.dict(ScreenRecorder._quality_mode, clear=True), \
+             patch('platform.machine', return_value="x86_64"), \
+             patch('subprocess.run') as mock_run:
+            assert ScreenRecorder(tmp_path / "a.mp4", codec="hevc").start()
+        
+        cmd = mock_popen.call_args.args[0]
+        assert "-q:v" not in cmd
+        assert cmd[cmd.index("-b:v") + 1] == ScreenRecorder.DEFAULT_BITRATE["hevc"]
+        mock_run.assert_not_called()
+    
+    def test_audio_outputs_fragment_by_duration(self, tmp_path):
+        """Audio-only outputs have no keyframes, so they must fragment by time."""
+        from recorder import ScreenRecorder
+        
+        ScreenRecorder._ffmpeg_available = True
+        audio_outputs = [("default", tmp_path / "mic.m4a"), ("BlackHole 2ch", tmp_path / "audio.m4a")]
+        with patch('subprocess.Popen', return_value=_running_ffmpeg()) as mock_popen:
+            assert ScreenRecorder(tmp_path / "screen.mp4", codec="h264", audio_outputs=audio_outputs).start()
+        
+        cmd = mock_popen.call_args.args[0]
+        ends = [i for i, arg in enumerate(cmd) if arg.startswith("pipe:")]
+        assert len(ends) == 3
+        video = cmd[cmd.index("-map"):ends[0]]
+        assert "-frag_duration" not in video
+        for start, end in zip(ends, ends[1:]):
+            out = cmd[start + 1:end + 1]
+            assert out[:2] == ["-map", f"{ends.index(start) + 1}:a"]
+            assert out[out.index("-frag_duration") + 1] == "1000000"
+    
+    def test_drops_audio_input_that_fails_to_open(self, tmp_path):
+        """An audio device ffmpeg can't open costs only its own output."""
+        from recorder import ScreenRecorder
+        
+        ScreenRecorder._ffmpeg_available = True
+        running = _running_ffmpeg()
+        
+        def popen(cmd, stderr, **kwargs):
+            if ":BlackHole 2ch" in cmd:
+                stderr.write(b"[in#2 @ 0x1] Error opening input: Input/output error\n")
+                return Mock(**{"wait.return_value": 1})
+            return running
+        
+        audio_outputs = [("default", tmp_path / "mic.m4a"), ("BlackHole 2ch", tmp_path / "audio.m4a")]
+        recorder = ScreenRecorder(tmp_path / "screen.mp4", codec="h264", audio_outputs=audio_outputs)
+        with patch('subprocess.Popen', side_effect=popen) as mock_popen:
+            assert recorder.start()
+        
+        assert mock_popen.call_count == 2
+        assert recorder.process is running
+        assert recorder.audio_outputs == audio_outputs[:1]
+        assert not (tmp_path / "audio.m4a").exists()
+    
+    def test_reports_screen_that_fails_to_open(self, tmp_path):
+        """When the screen itself can't be opened, the error says so."""
+        from recorder import ScreenRecorder
+        
+        ScreenRecorder._ffmpeg_available = True
+        
+        def popen(cmd, stderr, **kwargs):
+            stderr.write(b"1:none: Input/output error\n")
+            return Mock(**{"wait.return_value": 1})
+        
+        recorder = ScreenRecorder(tmp_path / "screen.mp4", codec="h264",
+                                  audio_outputs=[("default", tmp_path / "mic.m4a")])
+        with patch('subprocess.Popen', side_effect=popen):
+            assert not recorder.start()
+        assert recorder.get_error() == "ffmpeg could not open screen: 1:none: Input/output error"
+    
+    def test_stop_with_blocked_signals(self, tmp_path):
+        """stop() ends ffmpeg gracefully even if it inherited a blocked SIGINT/SIGTERM mask."""
+        import signal
+        import subprocess
+        from recorder import ScreenRecorder
+        
+        # Stand-in for ffmpeg: exits cleanly on 'q', as ffmpeg does
+        old_mask = signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGINT, signal.SIGTERM})
+        try:
+            process = subprocess.Popen(
+                [sys.executable, "-c", "import sys; sys.stdin.buffer.read(1); sys.exit(0)"],
+                stdin=subprocess.PIPE, bufsize=0,
+            )
+        finally:
+            signal.pthread_sigmask(signal.SIG_SETMASK, old_mask)
+        
+        recorder = ScreenRecorder(tmp_path / "a.mp4")
+        recorder.process = process
+        with patch.object(process, "kill", wraps=process.kill) as kill:
+            recorder.stop()
+        assert process.returncode == 0
+        assert process.stdin.closed
+        kill.assert_not_called()
+    
+    def test_auto_codec(self, tmp_path):
+        """auto picks HEVC only when ffmpeg has hevc_videotoolbox."""
+        from recorder import ScreenRecorder
+        
+        recorder = ScreenRecorder(tmp_path / "a.mp4")
+        with patch.object(ScreenRecorder, "_encoders", frozenset({"hevc_videotoolbox"})):
+            assert recorder._resolve_codec() == "hevc"
+        with patch.object(ScreenRecorder, "_encoders", frozenset({"h264_videotoolbox"})):
+            assert recorder._resolve_codec() == "h264"
 
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
+
+
+class TestCli:
+    """Tests for the recorder CLI with all capture mocked."""
+    
+    def _run(self, tmp_path, screen_ok):
+        import recorder
+        
+        started = []
+        
+        def audio_start(self):
+            started.append(self.output_path.name)
+            return True
+        
+        selector = Mock()
+        selector.__enter__ = Mock(return_value=Mock(select=Mock(return_value=[1])))
+        selector.__exit__ = Mock(return_value=False)
+        argv = ["recorder.py", "session", "--no-bluetooth", "--output-dir", str(tmp_path)]
+        with patch.object(sys, "argv", argv), \
+             patch.object(recorder.PermissionChecker, "validate_all", return_value={"screen_recording": True}), \
+             patch.object(recorder.ScreenRecorder, "list_audio_devices", return_value=["BlackHole 2ch"]), \
+             patch.object(recorder.ScreenRecorder, "start", return_value=screen_ok), \
+             patch.object(recorder.ScreenRecorder, "stop"), \
+             patch.object(recorder.AudioRecorder, "start", audio_start), \
+             patch.object(recorder.AudioRecorder, "stop"), \
+             patch.object(recorder, "SleepInhibitor"), \
+             patch.object(recorder, "play_sound"), \
+             patch.object(recorder.selectors, "DefaultSelector", return_value=selector), \
+             pytest.raises(SystemExit):
+            recorder.cli()
+        return started
+    
+    def test_audio_falls_back_when_screen_fails(self, tmp_path):
+        """A failed screen ffmpeg must not take the mic and system audio with it."""
+        assert sorted(self._run(tmp_path, screen_ok=False)) == ["audio.wav", "mic.wav"]
+    
+    def test_audio_rides_in_screen_ffmpeg(self, tmp_path):
+        """With the screen running, no separate sounddevice recorders start."""
+        assert self._run(tmp_path, screen_ok=True) == []
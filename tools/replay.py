@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Print a recorded Bluetooth log as JSON Lines.
+
+Reads both formats written by main_minimal.py:
+- bluetooth.jsonl   — one JSON object per line
+- bluetooth.msgpack — 4-byte little-endian length + msgpack record
+
+Usage: python tools/replay.py <session_dir>/bluetooth.msgpack
+"""
+
+import json
+import mmap
+import sys
+from pathlib import Path
+
+
+def _to_json(value):
+    """Hex-encode raw bytes (msgpack manufacturer_data) for JSON output."""
+    if isinstance(value, bytes):
+        return value.hex()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def iter_msgpack(path: Path):
+    """Yield events from a length-prefixed msgpack log."""
+    import msgpack
+
+    with open(path, "rb") as f:
+        if f.seek(0, 2) == 0:
+            return  # mmap cannot map an empty file
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            pos, end = 0, len(buf)
+            while pos + 4 <= end:
+                size = int.from_bytes(buf[pos:pos + 4], "little")
+                pos += 4
+                if pos + size > end:
+                    break  # truncated tail record (e.g. crash mid-write)
+                # main_minimal stores manufacturer_data with int keys
+                yield msgpack.unpackb(buf[pos:pos + size], raw=False, strict_map_key=False)
+                pos += size
+
+
+def iter_jsonl(path: Path):
+    """Yield events from a JSON Lines log."""
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def iter_events(path: Path):
+    """Yield events from either log format, chosen by file suffix."""
+    if path.suffix == ".msgpack":
+        return iter_msgpack(path)
+    return iter_jsonl(path)
+
+
+def main():
+    if len(sys.argv) != 2:
+        print(__doc__.strip().splitlines()[-1], file=sys.stderr)
+        sys.exit(1)
+    for event in iter_events(Path(sys.argv[1])):
+        print(json.dumps(event, ensure_ascii=False, default=_to_json))
+
+
+if __name__ == "__main__":
+    main()